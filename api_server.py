@@ -0,0 +1,313 @@
+"""Read/write HTTP API over the same cached data layer as the Streamlit pages.
+
+    python api_server.py --port 8600
+
+GET  /due?line=&sub_assembly=&kind=&fixture_no=&station_no=
+GET  /due/groups?line=      one entry per fixture/station with its due row ids
+GET  /history?from=YYYY-MM-DD&to=YYYY-MM-DD&line=&audit_no=
+POST /audits   {"employee_id": "...", "records": [{"row_id": 3, "status": "No",
+                "changed_before_date": "18-10-2026", "remarks": "..."}]}
+
+A submission has the same effect as "Save Audit" on the Components page.
+/history reads archived months only when from/to/audit_no reach into them.
+
+GET  /metrics   Prometheus text exposition of this process
+GET  /changes?after=&limit=     change feed entries with seq > after
+GET  /changes/offset?consumer=  last seq the consumer committed
+POST /changes/offset   {"consumer": "mirror-1", "seq": 42}
+
+GET responses carry an ETag derived from the data version, so a client
+sending If-None-Match gets a 304 without any recomputation.
+"""
+import argparse
+import datetime as dt
+import hashlib
+import json
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+import audit_engine as engine
+import change_feed
+import metrics
+from due_snapshots import ensure_due_snapshot
+
+DUE_FILTERS = ["line", "sub_assembly", "kind", "fixture_no", "station_no"]
+DUE_COLUMNS = [
+    "row_id", "line", "sub_assembly", "kind", "fixture_no", "station_no",
+    "station_name", "fixture_part_desc", "check_point", "qty",
+    "frequency_cycles", "current_frequency", "cycles_source", engine.DATE_COL,
+]
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _records(df: pd.DataFrame) -> list:
+    df = df.astype(object).where(df.notna(), None)
+    return df.to_dict("records")
+
+
+def _parse_day(value: str, name: str) -> str:
+    try:
+        return dt.date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ApiError(400, f"'{name}' must be YYYY-MM-DD")
+
+
+# ---------- QUERIES ----------
+def query_due(params: dict) -> list:
+    df_due = engine.get_due_items(lines=[params["line"]] if params.get("line") else None)
+    for col in DUE_FILTERS:
+        if params.get(col):
+            df_due = df_due[df_due[col].astype(str) == params[col]]
+    cols = [c for c in DUE_COLUMNS if c in df_due.columns]
+    df_out = df_due[cols].copy()
+    df_out["remaining_cycles"] = df_out["frequency_cycles"] - df_out["current_frequency"]
+    df_out[engine.DATE_COL] = df_out[engine.DATE_COL].map(
+        lambda d: d.isoformat() if isinstance(d, dt.date) else None
+    )
+    return _records(df_out)
+
+
+def query_due_groups(params: dict) -> list:
+    df_groups = engine.get_due_groups(lines=[params["line"]] if params.get("line") else None)
+    df_groups = df_groups.drop(columns=["S.No", "Audit No"])
+    df_groups["row_ids"] = df_groups["row_ids"].map(lambda ids: [int(i) for i in ids])
+    return _records(df_groups)
+
+
+def query_history(params: dict) -> list:
+    if params.get("audit_no") and not params["audit_no"].isdigit():
+        raise ApiError(400, "'audit_no' must be a number")
+    df_hist = engine.load_history(
+        since=_parse_day(params["from"], "from") if params.get("from") else None,
+        until=_parse_day(params["to"], "to") if params.get("to") else None,
+        audit_no=params.get("audit_no") or None,
+    )
+    if df_hist.empty:
+        return []
+    day = df_hist["timestamp"].astype(str).str[:10]
+    if params.get("from"):
+        df_hist = df_hist[day >= _parse_day(params["from"], "from")]
+        day = day[df_hist.index]
+    if params.get("to"):
+        df_hist = df_hist[day <= _parse_day(params["to"], "to")]
+    if params.get("line"):
+        df_hist = df_hist[df_hist["line"].astype(str) == params["line"]]
+    if params.get("audit_no"):
+        df_hist = df_hist[df_hist["audit_no"].astype(str) == params["audit_no"]]
+    return _records(df_hist)
+
+
+def _int_param(params: dict, name: str, default: int) -> int:
+    value = params.get(name)
+    if value is None or value == "":
+        return default
+    if not str(value).isdigit():
+        raise ApiError(400, f"'{name}' must be a non-negative number")
+    return int(value)
+
+
+def query_changes(params: dict) -> dict:
+    after = _int_param(params, "after", 0)
+    limit = min(_int_param(params, "limit", 1000), 10000)
+    return {"changes": change_feed.read_changes(after, limit), "last_seq": change_feed.last_seq()}
+
+
+def get_change_offset(params: dict) -> dict:
+    try:
+        return {"consumer": params.get("consumer"),
+                "seq": change_feed.get_offset(params.get("consumer"))}
+    except ValueError as e:
+        raise ApiError(400, str(e))
+
+
+def commit_change_offset(payload: dict) -> dict:
+    if not isinstance(payload.get("seq"), int):
+        raise ApiError(400, "'seq' must be a number")
+    try:
+        seq = change_feed.commit_offset(payload.get("consumer"), payload["seq"])
+    except ValueError as e:
+        raise ApiError(400, str(e))
+    return {"consumer": payload["consumer"], "seq": seq}
+
+
+# ---------- AUDIT SUBMISSION ----------
+def submit_audit(payload: dict) -> dict:
+    """Update change dates and log the "No" rows to history under a new audit number.
+
+    The number is assigned by the engine under its cross-process write lock.
+    """
+    records = payload.get("records")
+    if not isinstance(records, list) or not records:
+        raise ApiError(400, "'records' must be a non-empty list")
+    if not all(isinstance(rec, dict) for rec in records):
+        raise ApiError(400, "every record must be an object")
+
+    df_cfg = engine.load_master()
+    now = dt.datetime.now().isoformat(timespec="seconds")
+    date_updates = {}
+    history_rows = []
+
+    for rec in records:
+        row_id = rec.get("row_id")
+        if not isinstance(row_id, int) or isinstance(row_id, bool) or row_id not in df_cfg.index:
+            raise ApiError(400, f"unknown row_id {row_id!r}")
+        status = rec.get("status", "Yes")
+        if status not in ("Yes", "No"):
+            raise ApiError(400, f"row {row_id}: status must be 'Yes' or 'No'")
+        changed = df_cfg.loc[row_id, engine.DATE_COL]
+        if rec.get("changed_before_date"):
+            try:
+                changed = dt.datetime.strptime(str(rec["changed_before_date"]),
+                                               "%d-%m-%Y").date()
+            except ValueError:
+                raise ApiError(400, f"row {row_id}: changed_before_date must be DD-MM-YYYY")
+            date_updates[row_id] = changed
+        elif status == "No":  # part replaced during the audit
+            changed = dt.date.today()
+            date_updates[row_id] = changed
+
+        row = df_cfg.loc[row_id]
+        if status == "No":
+            history_rows.append(
+                {
+                    "timestamp": now,
+                    "audit_no": None,  # assigned by append_audit_history
+                    "employee_id": str(payload.get("employee_id", "")),
+                    "line": row["line"],
+                    "sub_assembly": row["sub_assembly"],
+                    "kind": row["kind"],
+                    "fixture_no": row["fixture_no"] if row["kind"] == "Fixture" else "",
+                    "station_no": row["station_no"] if row["kind"] != "Fixture" else "",
+                    "fixture_part_desc": row["fixture_part_desc"],
+                    "check_point": row["check_point"],
+                    "qty": int(row["qty"]),
+                    "status": status,
+                    "changed_before_date": changed.strftime("%d-%m-%Y")
+                    if isinstance(changed, dt.date)
+                    else "",
+                    "remarks": str(rec.get("remarks") or ""),
+                    "image_info": "",
+                }
+            )
+
+    engine.save_master_dates(date_updates)
+    checked = df_cfg.loc[[rec["row_id"] for rec in records]]
+    audit_no = engine.append_audit_history(history_rows, checked=checked)
+    return {"audit_no": audit_no, "items_checked": len(records), "issues_logged": len(history_rows)}
+
+
+# ---------- HTTP ----------
+ROUTES = {"/due": query_due, "/due/groups": query_due_groups, "/history": query_history,
+          "/changes": query_changes}
+UNCACHED_ROUTES = {"/changes/offset": get_change_offset}  # offsets are not data writes
+POST_ROUTES = {"/audits": (submit_audit, 201), "/changes/offset": (commit_change_offset, 200)}
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "FixtureAuditAPI/1.0"
+
+    def _send_json(self, status: int, body, etag: str = None):
+        data = json.dumps(body, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _internal_error(self):
+        self.log_error("%s", traceback.format_exc())
+        self._send_json(500, {"error": "internal server error"})
+
+    def do_GET(self):
+        try:
+            self._get()
+        except Exception:
+            self._internal_error()
+
+    def _get(self):
+        ensure_due_snapshot()  # today's due set for the trend, once per day
+        url = urlparse(self.path)
+        if url.path == "/metrics":
+            data = metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if url.path in UNCACHED_ROUTES:
+            try:
+                self._send_json(200, UNCACHED_ROUTES[url.path](params))
+            except ApiError as e:
+                self._send_json(e.status, {"error": str(e)})
+            return
+        handler = ROUTES.get(url.path)
+        if handler is None:
+            self._send_json(404, {"error": "not found"})
+            return
+
+        # the due list also depends on the calendar day
+        raw = f"{engine.data_version()}|{dt.date.today()}|{url.path}?{url.query}"
+        etag = '"' + hashlib.sha1(raw.encode()).hexdigest()[:20] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        try:
+            body = handler(params)
+        except ApiError as e:
+            self._send_json(e.status, {"error": str(e)})
+            return
+        self._send_json(200, body, etag=etag)
+
+    def do_POST(self):
+        route = POST_ROUTES.get(urlparse(self.path).path)
+        if route is None:
+            self._send_json(404, {"error": "not found"})
+            return
+        handler, status = route
+        try:
+            ensure_due_snapshot()
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(payload, dict):
+                raise ApiError(400, "body must be a JSON object")
+            result = handler(payload)
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": "body must be JSON"})
+            return
+        except ApiError as e:
+            self._send_json(e.status, {"error": str(e)})
+            return
+        except Exception:
+            self._internal_error()
+            return
+        self._send_json(status, result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fixture audit HTTP/JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), ApiHandler)
+    print(f"Serving fixture audit API on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,46 @@ import streamlit as st
 import pandas as pd
 import datetime as dt
 import os
+import uuid
+
+
+from audit_engine import (
+    CYCLES_PER_DAY,
+    DATE_COL,
+    EDITABLE_COLUMNS,
+    HISTORY_PATH,
+    IMAGES_DIR,
+    THRESHOLD,
+    append_audit_history,
+    apply_master_changes,
+    current_cycles_table,
+    data_version,
+    filter_master,
+    get_completed_today_count,
+    get_due_groups,
+    get_next_audit_no,
+    hierarchy,
+    list_lines,
+    load_history,
+    load_master,
+    plan_audits,
+    read_archive_summary,
+    save_master_dates,
+    simulate_workload,
+)
+from due_snapshots import ensure_due_snapshot, load_due_trend
+from image_manifest import get_image_manifest
+import metrics
+from reliability import load_rollup, point_summary
+from report_export import export_report
+from search_index import get_search_index
+from session_store import (
+    RowState,
+    clear_session_checklist,
+    session_checklist,
+    session_report,
+    track_session,
+)
 
 # ---------------- BASIC SETUP ----------------
 st.set_page_config(
@@ -10,265 +50,43 @@ st.set_page_config(
     initial_sidebar_state="collapsed",
 )
 
-MASTER_PATH = "config_master.csv"
-HISTORY_PATH = "audit_history.csv"
-IMAGES_DIR = "images"
 os.makedirs(IMAGES_DIR, exist_ok=True)
+track_session()
+
+DASH_REFRESH_SECONDS = 30  # Dashboard auto-refresh interval
+CONFIG_COLUMNS = [  # shown on Configure until the user picks others
+    "line", "sub_assembly", "kind", "fixture_no", "station_no", "station_name",
+    "fixture_part_desc", "check_point", "qty", "frequency_cycles", DATE_COL, "retired",
+]
 
 # ---------- NEW DARK-CYAN THEME CSS ----------
+# static/theme_dark.css is served by Streamlit (.streamlit/config.toml) and
+# cached by the browser, so a rerun only sends this link
 st.markdown(
-    """
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;500;600;700&display=swap');
-
-    :root {
-        --bg-main: #020617;
-        --bg-panel: #020617;
-        --bg-card: #0b1120;
-        --accent: #38bdf8;
-        --accent-soft: #0ea5e9;
-        --accent-strong: #0284c7;
-        --text-main: #e5e7eb;
-        --text-muted: #9ca3af;
-        --border-soft: #1f2937;
-    }
-
-    .stApp {
-        background: radial-gradient(circle at top left, #1e293b 0, #020617 50%, #020617 100%);
-        color: var(--text-main);
-        font-family: "Poppins", -apple-system, BlinkMacSystemFont, "Roboto", sans-serif;
-    }
-
-    .block-container {
-        padding-top: 1.5rem;
-        padding-bottom: 2.0rem;
-        max-width: 1200px;
-    }
-
-    h1 {
-        font-size: 2.3rem;
-        font-weight: 700;
-        letter-spacing: 0.03em;
-        color: #f9fafb;
-    }
-    h2, h3 {
-        color: #f9fafb;
-        font-weight: 600;
-    }
-
-    [data-testid="stMetric"] {
-        background: linear-gradient(135deg, #111827, #020617);
-        border-radius: 14px;
-        border: 1px solid var(--border-soft);
-        box-shadow: 0 18px 40px rgba(15, 23, 42, 0.8);
-        padding-top: 0.7rem;
-        padding-bottom: 0.7rem;
-    }
-    [data-testid="stMetricValue"] {
-        color: #f9fafb;
-        font-weight: 700;
-        font-size: 1.4rem;
-    }
-    [data-testid="stMetricLabel"] {
-        color: var(--text-muted);
-        text-transform: uppercase;
-        letter-spacing: 0.08em;
-        font-size: 0.75rem;
-    }
-
-    [data-testid="stSidebar"] {
-        background: #020617;
-        border-right: 1px solid #1f2937;
-    }
-
-    .hide-sidebar [data-testid="stSidebar"] {
-        display: none;
-    }
-    .hide-sidebar [data-testid="collapsedControl"] {
-        display: none;
-    }
-
-    .sidebar-title {
-        font-size: 1.4rem;
-        font-weight: 700;
-        color: #f9fafb;
-        margin-bottom: 0.2rem;
-    }
-    .sidebar-subtitle {
-        font-size: 0.85rem;
-        color: var(--text-muted);
-        margin-bottom: 0.7rem;
-    }
-
-    div[data-testid="stSidebar"] div[data-testid="stButton"] > button {
-        background: #020617;
-        color: var(--text-main);
-        border-radius: 999px;
-        border: 1px solid #1f2937;
-        padding: 0.35rem 0.7rem;
-        font-weight: 500;
-        font-size: 0.9rem;
-    }
-    div[data-testid="stSidebar"] div[data-testid="stButton"] > button:hover {
-        background: #0b1120;
-        border-color: var(--accent);
-        color: #f9fafb;
-    }
-
-    .login-card {
-        max-width: 520px;
-        margin: 3rem auto 0 auto;
-        padding: 0;
-        background: transparent;
-        border-radius: 0;
-        box-shadow: none;
-        border: none;
-    }
-    .login-title {
-        font-size: 2.1rem;
-        font-weight: 700;
-        color: #f9fafb;
-        margin-bottom: 0.15rem;
-    }
-    .login-subtitle {
-        font-size: 0.95rem;
-        color: var(--text-muted);
-        margin-bottom: 1.4rem;
-    }
-
-    .stTextInput > label {
-        font-weight: 500;
-        color: var(--text-main);
-    }
-    .stTextInput input {
-        background-color: #020617;
-        color: #e5e7eb;
-        border-radius: 999px;
-        border: 1px solid #1f2937;
-    }
-    .stTextInput input:focus {
-        border-color: var(--accent);
-        box-shadow: 0 0 0 1px var(--accent-soft);
-    }
-
-    button[kind="primary"] {
-        background: linear-gradient(135deg, var(--accent), var(--accent-strong)) !important;
-        color: #0b1120 !important;
-        border-radius: 999px !important;
-        border: 1px solid var(--accent-strong) !important;
-        padding: 0.45rem 1.6rem !important;
-        font-weight: 600 !important;
-        letter-spacing: 0.02em;
-    }
-    button[kind="primary"]:hover {
-        background: linear-gradient(135deg, var(--accent-strong), var(--accent)) !important;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True,
+    '<link rel="stylesheet" href="app/static/theme_dark.css">', unsafe_allow_html=True
 )
 
-# ---------- LOAD MASTER CONFIG ----------
-df_cfg = pd.read_csv(MASTER_PATH)
-
-
-for col in ["qty", "frequency_cycles"]:
-    if col in df_cfg.columns:
-        df_cfg[col] = pd.to_numeric(df_cfg[col], errors="coerce").fillna(0).astype(int)
-
-date_col = "Changed before date"
-if date_col in df_cfg.columns:
-    df_cfg[date_col] = pd.to_datetime(
-        df_cfg[date_col].astype(str).str.strip(),
-        format="%d-%m-%Y",
-        errors="coerce",
-    ).dt.date
-
-df_cfg["line"] = df_cfg["line"].astype(str)
-df_cfg["sub_assembly"] = df_cfg["sub_assembly"].astype(str)
-df_cfg["kind"] = df_cfg["kind"].astype(str)
-
-# ---------- DASHBOARD HELPERS ----------
-THRESHOLD = 5000  # cycles
-
-def working_cycles_from_date(change_date: dt.date, today: dt.date) -> int:
-    if not isinstance(change_date, dt.date):
-        return 0
-    d = change_date
-    days = 0
-    step = dt.timedelta(days=1)
-    while d < today:
-        if d.weekday() != 6:  # Sunday
-            days += 1
-        d += step
-    return days * 1800
-
-def get_due_items():
-    today = dt.date.today()
-    df_tmp = df_cfg.copy()
-    df_tmp = df_tmp[df_tmp["frequency_cycles"] > 0]
-    df_tmp["current_frequency"] = df_tmp[date_col].apply(
-        lambda d: working_cycles_from_date(d, today)
-    )
-    diff = df_tmp["frequency_cycles"] - df_tmp["current_frequency"]
-    df_tmp = df_tmp[diff.between(0, THRESHOLD)]
-    df_tmp = df_tmp.reset_index().rename(columns={"index": "row_id"})
-    df_tmp.insert(0, "S.No", df_tmp.index + 1)
-    df_tmp.insert(1, "Audit No", df_tmp["S.No"])
-    return df_tmp
-
-def get_completed_today_count():
-    if not os.path.exists(HISTORY_PATH):
-        return 0
-    df_hist = pd.read_csv(HISTORY_PATH)
-    if df_hist.empty or "timestamp" not in df_hist.columns:
-        return 0
-    today_str = dt.date.today().strftime("%Y-%m-%d")
-    today_audits = df_hist[df_hist["timestamp"].str.startswith(today_str)]
-    return len(today_audits)
-
-# ---------- AUDIT HISTORY HELPERS ----------
-def get_next_audit_no() -> int:
-    if not os.path.exists(HISTORY_PATH):
-        return 1
-    df_hist = pd.read_csv(HISTORY_PATH)
-    if "audit_no" not in df_hist.columns or df_hist.empty:
-        return 1
-    nums = pd.to_numeric(df_hist["audit_no"], errors="coerce").dropna()
-    if nums.empty:
-        return 1
-    return int(nums.max()) + 1
-
-def append_audit_history(records: list):
-    if not records:
-        return
-    new_df = pd.DataFrame(records)
-    if os.path.exists(HISTORY_PATH):
-        new_df.to_csv(HISTORY_PATH, mode="a", header=False, index=False)
-    else:
-        new_df.to_csv(HISTORY_PATH, mode="w", header=True, index=False)
+# ---------- MASTER CONFIG ----------
+# parsed once per file version in audit_engine and shared by all sessions;
+# pages load only the lines they show (one shard each when sharded)
+date_col = DATE_COL
 
 # ---------- PAGE / NAV STATE ----------
-PAGES = ["Dashboard", "Components", "Configure", "Audit History"]
+PAGES = ["Dashboard", "Components", "Configure", "Planning", "Audit History"]
 
 if "page" not in st.session_state:
     st.session_state["page"] = "Login"
 
 page = st.session_state["page"]
+metrics.inc("fixture_audit_reruns_total", page=page)
+metrics.maybe_write_textfile()
+ensure_due_snapshot()  # today's due set for the trend, once per day
 
 def nav_card(label: str, danger: bool = False):
+    # colours are in static/theme_dark.css; the current page is the primary button
     is_active = st.session_state["page"] == label
-
-    if danger:
-        bg = "#fef2f2"
-        border = "#b91c1c"
-        txt = "#b91c1c"
-    else:
-        bg = "#0b1120" if is_active else "#020617"
-        border = "#38bdf8" if is_active else "#1f2937"
-        txt = "#e5e7eb"
-
-    if st.button(label, key=f"nav_{label}", use_container_width=True):
+    if st.button(label, key=f"nav_{label}", type="primary" if is_active else "secondary",
+                 use_container_width=True):
         if danger:
             for k in list(st.session_state.keys()):
                 del st.session_state[k]
@@ -277,25 +95,7 @@ def nav_card(label: str, danger: bool = False):
             st.session_state["page"] = label
         st.rerun()
 
-    st.markdown(
-        f"""
-        <style>
-        div[data-testid="stSidebar"] div[data-testid="stButton"][key="nav_{label}"] > button {{
-            background-color: {bg};
-            border: 1px solid {border};
-            border-radius: 999px;
-            padding: 0.35rem 0.7rem;
-            margin-top: 0.12rem;
-            margin-bottom: 0.12rem;
-            text-align: left;
-            font-weight: 500;
-            font-size: 0.9rem;
-            color: {txt};
-        }}
-        </style>
-        """,
-        unsafe_allow_html=True,
-    )
+
 # ---------- SIDEBAR (ONLY AFTER LOGIN) ----------
 if page != "Login":
     with st.sidebar:
@@ -373,97 +173,130 @@ if page == "Login":
 elif page == "Dashboard":
     st.title("Dashboard")
 
-    df_due = get_due_items()
-    completed_today = get_completed_today_count()
+    dash_line = st.selectbox("Line", ["All lines"] + list_lines())
+    auto_refresh = st.toggle(
+        "Auto-refresh",
+        key="dash_auto_refresh",
+        help=f"Check for saved audits every {DASH_REFRESH_SECONDS} s and update the list below.",
+    )
 
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric("Pending Audits", len(df_due))
-    with col2:
-        st.metric("Completed Today", completed_today)
-    with col3:
-        st.metric("Threshold (cycles)", THRESHOLD)
+    # Only this fragment reruns on the timer. A tick costs one data-version
+    # check; the due set and counts come from the engine caches and are only
+    # recomputed after a save (on any replica) or at the change of day.
+    @st.fragment(run_every=DASH_REFRESH_SECONDS if auto_refresh else None)
+    def due_overview():
+        version = data_version()
+        if st.session_state.get("dash_version") != version:
+            st.session_state["dash_version"] = version
+            st.session_state["dash_changed_at"] = dt.datetime.now().strftime("%H:%M:%S")
+
+        # one entry per fixture/station, opening a single audit over all
+        # of its due check points
+        df_due = get_due_groups(lines=None if dash_line == "All lines" else [dash_line])
+        completed_today = get_completed_today_count()
+
+        # the trend, the metrics gauge and Planning count check points; the
+        # list below has one entry per fixture/station
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Check points due", int(df_due["due_points"].sum()))
+        with col2:
+            st.metric("Fixtures/stations due", len(df_due))
+        with col3:
+            st.metric("Completed Today", completed_today)
+        with col4:
+            st.metric("Threshold (cycles)", THRESHOLD)
+
+        if auto_refresh:
+            st.caption(f"Live - last change seen at {st.session_state['dash_changed_at']}")
+
+        st.divider()
+        st.subheader("Fixtures / Tools Near Due")
+
+        if df_due.empty:
+            st.write("No fixtures or tools within 5000 cycles of their limit.")
+        else:
+            for _, row in df_due.iterrows():
+                s_no = int(row["S.No"])
+                a_no = row["Audit No"]
+                line = row["line"]
+                sub_assembly = row["sub_assembly"]
+                kind = row["kind"]
+                fixture_no = row.get("fixture_no", None)
+                station_no = row.get("station_no", None)
+                row_ids = [int(i) for i in row["row_ids"]]
+
+                with st.container():
+                    c1, c2, c3, c4, c5, c6 = st.columns([0.8, 2.2, 1.8, 2.0, 2.0, 3.0])
+                    with c1:
+                        st.write(s_no)
+                    with c2:
+                        if st.button(
+                            f"Audit {a_no}",
+                            key=f"audit_btn_{row_ids[0]}",
+                            use_container_width=True,
+                        ):
+                            st.session_state["page"] = "Components"
+                            st.session_state["selected_line"] = line
+                            st.session_state["selected_sub_assembly"] = sub_assembly
+                            st.session_state["selected_kind"] = kind
+                            st.session_state["selected_fixture_no"] = (
+                                str(fixture_no) if pd.notna(fixture_no) else None
+                            )
+                            st.session_state["selected_station_no"] = (
+                                str(station_no) if pd.notna(station_no) else None
+                            )
+                            st.session_state["selected_row_ids"] = row_ids
+                            st.session_state.pop("audit_draft", None)
+
+                            st.rerun()
+                    with c3:
+                        st.write(line)
+                    with c4:
+                        st.write(sub_assembly)
+                    with c5:
+                        st.write(kind)
+                    with c6:
+                        st.write(
+                            f"{row['unit']}: {row['due_points']} due, "
+                            f"{int(row['min_remaining'])} cycles left"
+                        )
 
-    st.divider()
-    st.subheader("Fixtures / Tools Near Due")
+    due_overview()
 
-    if df_due.empty:
-        st.write("No fixtures or tools within 5000 cycles of their limit.")
-    else:
-        for _, row in df_due.iterrows():
-            s_no = int(row["S.No"])
-            a_no = row["Audit No"]
-            line = row["line"]
-            sub_assembly = row["sub_assembly"]
-            kind = row["kind"]
-            fixture_no = row.get("fixture_no", None)
-            station_no = row.get("station_no", None)
-            row_id = int(row["row_id"])
-
-            with st.container():
-                c1, c2, c3, c4, c5, c6 = st.columns([0.8, 2.2, 1.8, 2.0, 2.0, 3.0])
-                with c1:
-                    st.write(s_no)
-                with c2:
-                    if st.button(
-                        f"Audit {a_no}",
-                        key=f"audit_btn_{row_id}",
-                        use_container_width=True,
-                    ):
-                        st.session_state["page"] = "Components"
-                        st.session_state["selected_line"] = line
-                        st.session_state["selected_sub_assembly"] = sub_assembly
-                        st.session_state["selected_kind"] = kind
-                        st.session_state["selected_fixture_no"] = (
-                            str(fixture_no) if pd.notna(fixture_no) else None
-                        )
-                        st.session_state["selected_station_no"] = (
-                            str(station_no) if pd.notna(station_no) else None
-                        )
-                        st.session_state["selected_row_id"] = row_id
-                        st.session_state["current_audit_no"] = a_no
-                        st.rerun()
-                with c3:
-                    st.write(line)
-                with c4:
-                    st.write(sub_assembly)
-                with c5:
-                    st.write(kind)
-                with c6:
-                    st.write(row.get("fixture_part_desc", ""))
+    # chart the stored days; today's is written on the first rerun of any page
+    df_trend = load_due_trend()
+    if not df_trend.empty:
+        with st.expander("Check points due - trend"):
+
+            st.bar_chart(df_trend)
 
 # ---------------- COMPONENTS PAGE ----------------
 elif page == "Components":
     st.title("Components")
 
-    current_audit_no = st.session_state.get("current_audit_no", None)
-    if current_audit_no is None:
-        current_audit_no = get_next_audit_no()
-        st.session_state["current_audit_no"] = current_audit_no
-    audit_no = current_audit_no
+    # the audit number is only assigned under the write lock when the audit
+    # is saved; until then widgets and photos are keyed by a draft id
+    draft_id = st.session_state.setdefault("audit_draft", uuid.uuid4().hex[:12])
+
+    st.info(f"New audit (next number #{get_next_audit_no()}, final number assigned on save)")
 
-    st.info(f"Current Audit: #{audit_no}")
 
     line_default = st.session_state.get("selected_line", None)
     sa_default = st.session_state.get("selected_sub_assembly", None)
     kind_default = st.session_state.get("selected_kind", "Fixture")
     fixture_default = st.session_state.get("selected_fixture_no", None)
     station_default = st.session_state.get("selected_station_no", None)
-    selected_row_id = st.session_state.get("selected_row_id", None)
+    selected_row_ids = st.session_state.get("selected_row_ids", None)
     employee_id = st.session_state.get("employee_id", "")
 
-    line_list = sorted(df_cfg["line"].unique())
+    line_list = list_lines()
     line_index = line_list.index(line_default) if line_default in line_list else 0
     line = st.selectbox("Line", line_list, index=line_index)
+    df_cfg = load_master([line])
+    tree = hierarchy(line)
 
-    sa_options_all = (
-        df_cfg[df_cfg["line"] == line]["sub_assembly"]
-        .dropna()
-        .astype(str)
-        .drop_duplicates()
-        .tolist()
-    )
-    sa_list = sorted(sa_options_all)
+    sa_list = sorted(tree)
     sa_index = sa_list.index(sa_default) if sa_default in sa_list else 0
     sub_assembly = st.selectbox("Sub Assembly", sa_list, index=sa_index)
 
@@ -473,259 +306,156 @@ elif page == "Components":
         index=0 if kind_default == "Fixture" else 1,
     )
 
-    base_subset = df_cfg[
-        (df_cfg["line"] == line)
-        & (df_cfg["sub_assembly"] == sub_assembly)
-        & (df_cfg["kind"] == kind)
-    ]
+    units = tree.get(sub_assembly, {}).get(kind, {})  # unit no -> active row ids
 
     if kind == "Fixture":
-        fixture_options = base_subset["fixture_no"].dropna().astype(str).unique().tolist()
+        fixture_options = list(units)
         f_index = fixture_options.index(fixture_default) if fixture_default in fixture_options else 0
         fixture = st.selectbox("Fixture No.", fixture_options, index=f_index)
-        check_subset = base_subset[base_subset["fixture_no"].astype(str) == fixture]
+        check_subset = df_cfg.loc[units.get(fixture, [])]
         st.write(f"Selected fixture: {fixture}")
         station = ""
     else:
-        station_options = base_subset["station_no"].dropna().astype(str).unique().tolist()
+        station_options = list(units)
         s_index = station_options.index(station_default) if station_default in station_options else 0
         station = st.selectbox("Station No.", station_options, index=s_index)
-        check_subset = base_subset[base_subset["station_no"].astype(str) == station]
+        check_subset = df_cfg.loc[units.get(station, [])]
         station_name = str(check_subset["station_name"].iloc[0])
         st.write(f"Selected station: {station} – {station_name}")
         fixture = ""
 
-    if selected_row_id is not None and selected_row_id in check_subset.index:
-        check_subset = check_subset.loc[[selected_row_id]]
+    if selected_row_ids:  # audit opened from a due group: just its due points
+        due_ids = check_subset.index.intersection(selected_row_ids)
+        if len(due_ids):
+            check_subset = check_subset.loc[due_ids]
 
     st.divider()
     st.subheader("Checklist")
 
     today = dt.date.today()
-
-    def row_current_freq(idx):
-        change_date = df_cfg.loc[idx, date_col] if date_col in df_cfg.columns else None
-        return working_cycles_from_date(change_date, today)
-
-    base_cols = ["fixture_part_desc", "check_point", "qty", "frequency_cycles"]
-    table = check_subset[base_cols].copy()
-    table["current_frequency"] = [
-        row_current_freq(idx) for idx in check_subset.index
-    ]
-    table = table.rename(
-        columns={
-            "fixture_part_desc": "Fixture Part description",
-            "check_point": "Check point",
-            "qty": "Qty",
-            "frequency_cycles": "Frequency (cycles)",
-            "current_frequency": "Current frequency",
-        }
-    ).reset_index(drop=True)
-
-    ss = st.session_state
-    ss.setdefault("row_status", {})
-    ss.setdefault("row_change_date", {})
-    ss.setdefault("row_remarks", {})
-    ss.setdefault("row_image_mode", {})
-    ss.setdefault("row_image_path", {})
-
+    checklist = session_checklist()  # row id -> RowState (image capture), kept per session
     original_indices = check_subset.index.to_list()
-    history_rows = []
-
-    # helper for left-aligned cell content
-    def left(text):
-        st.markdown(
-            f"<div style='text-align:left;'>{text}</div>",
-            unsafe_allow_html=True,
-        )
 
-    # scrollable checklist container
-    st.markdown(
-        """
-        <div style="width:100%; overflow-x:auto;">
-          <div style="min-width:1300px;">
-        """,
-        unsafe_allow_html=True,
+    # the whole checklist is one grid widget; history records are only
+    # built when the audit is saved
+    grid = pd.DataFrame(
+        {
+            "S.No": range(1, len(check_subset) + 1),
+            "Fixture Part description": check_subset["fixture_part_desc"].to_numpy(),
+            "Check point": check_subset["check_point"].to_numpy(),
+            "Qty": check_subset["qty"].to_numpy(),
+            "Frequency (cycles)": check_subset["frequency_cycles"].to_numpy(),
+            # materialized once a day by the engine (counter totals or the day estimate)
+            "Current frequency": current_cycles_table(today, [line])
+            .loc[check_subset.index, "current_frequency"].to_numpy(),
+            "Status": "Yes",
+            "Changed before Date": [
+                d if isinstance(d, dt.date) else today for d in check_subset[date_col]
+            ],
+            "Remarks": "",
+        },
+        index=check_subset.index,
     )
-
-    # header row with centered headers
-    h0, h1, h2, h3, h4, h5, h_status, h8, h9, h10 = st.columns(
-        [1.0, 3.6, 2.5, 0.8, 1.8, 1.8, 1.4, 2.5, 2.7, 2.0]
+    editable = ["Status", "Changed before Date", "Remarks"]
+    edited = st.data_editor(
+        grid,
+        key=f"checklist_{draft_id}_{hash(tuple(original_indices))}",
+
+        hide_index=True,
+        use_container_width=True,
+        disabled=[c for c in grid.columns if c not in editable],
+        column_config={
+            "Status": st.column_config.SelectboxColumn(
+                "Status", options=["Yes", "No"], required=True
+            ),
+            "Changed before Date": st.column_config.DateColumn(
+                "Changed before Date", format="DD-MM-YYYY", required=True
+            ),
+            "Remarks": st.column_config.TextColumn("Remarks"),
+        },
     )
 
-    def center_header(text: str):
-        st.markdown(
-            f"<div style='text-align:center; font-weight:600;'>{text}</div>",
-            unsafe_allow_html=True,
-        )
-
-    with h0:
-        center_header("S.No")
-    with h1:
-        center_header("Fixture Part description")
-    with h2:
-        center_header("Check point")
-    with h3:
-        center_header("Qty")
-    with h4:
-        center_header("Frequency (cycles)")
-    with h5:
-        center_header("Current frequency")
-    with h_status:
-        center_header("Status")
-    with h8:
-        center_header("Changed before Date")
-    with h9:
-        center_header("Remark")
-    with h10:
-        center_header("Image")
-
-    # rows
-    for local_idx, row in table.iterrows():
-        df_index = original_indices[local_idx]
-
-        c0, c1, c2, c3, c4, c5, c_status, c8, c9, c10 = st.columns(
-            [1.0, 3.6, 2.5, 0.5, 1.8, 1.8, 1.6, 2.3, 2.5, 2.1]
-        )
-        with c0:
-            left(local_idx + 1)
-        with c1:
-            left(row["Fixture Part description"])
-        with c2:
-            left(row["Check point"])
-        with c3:
-            left(int(row["Qty"]))
-        with c4:
-            left(int(row["Frequency (cycles)"]))
-        with c5:
-            left(int(row["Current frequency"]))
-
-        csv_date = df_cfg.loc[df_index, date_col] if date_col in df_cfg.columns else None
-        default_date = csv_date if isinstance(csv_date, dt.date) else today
-
-        with c8:
-            key_dt = f"date_{df_index}"
-            chosen_date = st.date_input("", value=default_date, key=key_dt)
-            ss["row_change_date"][df_index] = chosen_date
-
-        with c_status:
-            current_status = ss["row_status"].get(df_index, "Yes")
-            status = st.radio(
-                " ",
-                options=["Yes", "No"],
-                index=0 if current_status == "Yes" else 1,
-                key=f"status_{df_index}",
-                horizontal=True,
+    # image capture only for the check points marked "No"
+    for df_index in edited.index[edited["Status"] == "No"]:
+        rs = checklist.setdefault(df_index, RowState())
+        s_no = int(edited.at[df_index, "S.No"])
+        # unique per draft and capture: a stored photo is never overwritten
+        base_name = f"audit_{draft_id}_row_{df_index}_{rs.image_key}.jpg"
+
+        c_label, c_image = st.columns([2, 3])
+        with c_label:
+            st.write(f"**{s_no}.** {edited.at[df_index, 'Fixture Part description']}")
+            if rs.image_path:
+                st.caption(os.path.basename(rs.image_path))
+        with c_image:
+            # new key once saved, so the widget's copy of the bytes is released
+            photo = st.camera_input(
+                f"Photo for {s_no}", key=f"cam_{df_index}_{rs.image_key}",
                 label_visibility="collapsed",
             )
-            ss["row_status"][df_index] = status
-
-        show_extra = (ss["row_status"][df_index] == "No")
-
-        with c9:
-            if show_extra:
-                key_rem = f"remark_{df_index}"
-                default_rem = ss["row_remarks"].get(df_index, "")
-                ss["row_remarks"][df_index] = st.text_input(
-                    "", value=default_rem, key=key_rem
-                )
-            else:
-                left("")
-
-
-        img_path = ss["row_image_path"].get(df_index, "")
-
-        # ---- CAMERA-ONLY IMAGE CAPTURE ----
-        with c10:
-            if show_extra:
-                base_name = f"audit_{audit_no}_row_{local_idx + 1}.jpg"
-                full_path = os.path.join(IMAGES_DIR, base_name)
+            if photo is not None:
+                try:
+                    rs.image_path = get_image_manifest(IMAGES_DIR).save_image(
+                        photo.getvalue(), base_name
+                    )
+                except ValueError as e:
+                    st.error(f"Photo not saved: {e}")
+                else:
+                    rs.image_key += 1
 
-                cam_key = f"cam_{df_index}"
-                photo = st.camera_input(
-                    "",
-                    key=cam_key,
-                )
-                if photo is not None:
-                    with open(full_path, "wb") as f:
-                        f.write(photo.getvalue())
-                    img_path = full_path
 
-                ss["row_image_path"][df_index] = img_path
+    if st.button("Save Audit"):
+        audited_items = original_indices
+        if not audited_items:
+            st.warning("No items to audit.")
+            st.rerun()
 
-                if img_path:
-                    left(os.path.basename(img_path))
-                else:
-                    left("")
-            else:
-                left("")
-        # -----------------------------------
+        df_audit = edited.copy()
+        df_audit["Changed before Date"] = pd.to_datetime(
+            df_audit["Changed before Date"], errors="coerce"
+        )
+        # parts found bad are replaced now: the master gets today, while
+        # history keeps the date the auditor entered
+        date_updates = {
+            idx: today if status == "No" else d.date()
+            for idx, status, d in zip(
+                df_audit.index, df_audit["Status"], df_audit["Changed before Date"]
+            )
+            if status == "No" or pd.notna(d)
+        }
 
-        history_rows.append(
+        # only "No" rows go to audit history
+        df_no = df_audit[df_audit["Status"] == "No"]
+        filtered_history = pd.DataFrame(
             {
                 "timestamp": dt.datetime.now().isoformat(timespec="seconds"),
-                "audit_no": audit_no,
+                "audit_no": None,  # assigned by append_audit_history
+
                 "employee_id": employee_id,
                 "line": line,
                 "sub_assembly": sub_assembly,
                 "kind": kind,
                 "fixture_no": fixture if kind == "Fixture" else "",
                 "station_no": station if kind != "Fixture" else "",
-                "fixture_part_desc": row["Fixture Part description"],
-                "check_point": row["Check point"],
-                "qty": int(row["Qty"]),
-                "status": ss["row_status"].get(df_index, ""),
-                "changed_before_date": chosen_date.strftime("%d-%m-%Y")
-                if isinstance(chosen_date, dt.date)
-                else "",
-                "remarks": ss["row_remarks"].get(df_index, ""),
-                "image_info": img_path,
-            }
-        )
-
-    st.markdown(
-        """
-          </div>
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
-    # --------- UPDATED SAVE AUDIT LOGIC ---------
-    if st.button("Save Audit"):
-        audited_items = []
-        for idx in original_indices:
-            if idx in ss.get("row_status", {}):
-                audited_items.append(idx)
-
-        if not audited_items:
-            st.warning("No items to audit.")
-            st.rerun()
-
-        today = dt.date.today()
-
-        for idx in audited_items:
-            status_val = ss.get("row_status", {}).get(idx, "Yes")
-            if status_val == "No":
-                df_cfg.loc[idx, date_col] = today
-                ss["row_change_date"][idx] = today
-            else:
-                date_val = ss.get("row_change_date", {}).get(idx)
-                if isinstance(date_val, dt.date):
-                    df_cfg.loc[idx, date_col] = date_val
-
-
-        filtered_history = [r for r in history_rows if r["status"] == "No"]
+                "fixture_part_desc": df_no["Fixture Part description"],
+                "check_point": df_no["Check point"],
+                "qty": df_no["Qty"].astype(int),
+                "status": "No",
+                "changed_before_date": df_no["Changed before Date"].dt.strftime("%d-%m-%Y")
+                .fillna(""),
+                "remarks": df_no["Remarks"].fillna(""),
+                "image_info": [
+                    checklist[i].image_path if i in checklist else "" for i in df_no.index
+                ],
+            },
+            index=df_no.index,
+        ).to_dict("records")
+
+        save_master_dates(date_updates)
+        # the final number is assigned under the write lock
+        audit_no = append_audit_history(filtered_history, checked=df_cfg.loc[audited_items])
 
 
-        df_to_save = df_cfg.copy()
-        df_to_save[date_col] = pd.to_datetime(
-            df_to_save[date_col], errors="coerce"
-        ).dt.strftime("%d-%m-%Y")
-        df_to_save[date_col] = df_to_save[date_col].fillna("")
-        df_to_save.to_csv(MASTER_PATH, index=False)
-
-        append_audit_history(filtered_history)
-
         total_items = len(audited_items)
         issues_found = len(filtered_history)
         st.success(
@@ -738,16 +468,13 @@ elif page == "Components":
             "selected_kind",
             "selected_fixture_no",
             "selected_station_no",
-            "selected_row_id",
-            "current_audit_no",
-            "row_status",
-            "row_change_date",
-            "row_remarks",
-            "row_image_mode",
-            "row_image_path",
+            "selected_row_ids",
+            "audit_draft",
+
         ]:
             if key in st.session_state:
                 del st.session_state[key]
+        clear_session_checklist()
 
 
         st.session_state["page"] = "Dashboard"
@@ -755,46 +482,320 @@ elif page == "Components":
 
 # ---------------- CONFIGURE PAGE ----------------
 elif page == "Configure":
-    st.title("Configure (view master data)")
-    st.write("Master configuration from config_master.csv:")
-    st.dataframe(df_cfg, use_container_width=True)
+    st.title("Configure (master data)")
+    st.write("Edit cells and press Save; only the changed cells are written.")
+
+    # filtered, trimmed to the chosen columns and paged on the server, so
+    # only the visible slice is serialized and sent to the browser
+    f1, f2, f3, f4 = st.columns(4)
+    with f1:
+        cfg_line = st.selectbox("Line", ["All lines"] + list_lines(), key="cfg_line")
+    cfg_lines = None if cfg_line == "All lines" else [cfg_line]
+    df_scope = load_master(cfg_lines)
+    with f2:
+        cfg_sa = st.selectbox(
+            "Sub assembly",
+            ["All"] + sorted(df_scope["sub_assembly"].dropna().unique()),
+            key="cfg_sa",
+        )
+    with f3:
+        cfg_kind = st.selectbox(
+            "Kind", ["All"] + sorted(df_scope["kind"].dropna().unique()), key="cfg_kind"
+        )
+    with f4:
+        cfg_unit = st.text_input("Fixture / station no", key="cfg_unit")
+
+    all_cols = list(df_scope.columns)
+    cfg_cols = st.multiselect(
+        "Columns",
+        all_cols,
+        default=[c for c in CONFIG_COLUMNS if c in all_cols],
+        key="cfg_cols",
+    )
+
+    row_ids = filter_master(
+        cfg_lines,
+        {
+            "sub_assembly": None if cfg_sa == "All" else cfg_sa,
+            "kind": None if cfg_kind == "All" else cfg_kind,
+        },
+        cfg_unit,
+    )
+    p1, p2, p3 = st.columns([1, 1, 3])
+    with p1:
+        page_size = st.selectbox("Rows per page", [25, 50, 100, 200], index=1, key="cfg_page_size")
+    n_pages = max(1, -(-len(row_ids) // page_size))
+    if st.session_state.get("cfg_page", 1) > n_pages:
+        st.session_state["cfg_page"] = n_pages
+    with p2:
+        cfg_page = st.number_input("Page", min_value=1, max_value=n_pages, step=1, key="cfg_page")
+    start = (cfg_page - 1) * page_size
+    with p3:
+        st.caption(
+            f"Rows {min(start + 1, len(row_ids))}-{min(start + page_size, len(row_ids))} "
+            f"of {len(row_ids)} matching ({len(df_scope)} in scope)"
+        )
+    # the key changes with the page and after this session's own save, so an
+    # edit set never carries over onto different rows; writes by anyone else
+    # leave edits in progress alone and apply_master_changes compares each
+    # cell against the current value when they are saved
+    page_ids = list(row_ids[start:start + page_size])
+    show_cols = cfg_cols or all_cols
+    editor_key = f"cfg_editor_{st.session_state.get('cfg_saves', 0)}_{hash(tuple(page_ids))}"
+
+    st.data_editor(
+        df_scope.loc[page_ids, show_cols],
+        use_container_width=True,
+        disabled=[c for c in show_cols if c not in EDITABLE_COLUMNS],
+        column_config={
+            DATE_COL: st.column_config.DateColumn(DATE_COL, format="DD-MM-YYYY"),
+            "retired": st.column_config.CheckboxColumn("retired"),
+        },
+        key=editor_key,
+    )
+    edited = st.session_state.get(editor_key, {}).get("edited_rows", {})
+    updates = {page_ids[int(pos)]: cells for pos, cells in edited.items() if cells}
+    if st.button(f"Save changes ({len(updates)} rows edited)", disabled=not updates):
+        try:
+            result = apply_master_changes(updates, author=st.session_state.get("employee_id", ""))
+        except ValueError as e:
+            st.error(f"Not saved: {e}")
+        else:
+            st.session_state["cfg_saves"] = st.session_state.get("cfg_saves", 0) + 1
+            st.session_state["cfg_saved"] = (
+
+                f"Saved: {result['modified']} rows modified, {result['retired']} retired."
+            )
+            st.rerun()
+    if "cfg_saved" in st.session_state:
+        st.success(st.session_state.pop("cfg_saved"))
+
+    with st.expander("Add check point"):
+        with st.form("cfg_add", clear_on_submit=True):
+            a1, a2, a3 = st.columns(3)
+            with a1:
+                new_line = st.selectbox("Line", list_lines() + ["New line..."])
+                new_line_name = st.text_input("New line name")
+                new_sa = st.text_input("Sub assembly")
+            with a2:
+                new_kind = st.selectbox("Kind", ["Fixture", "Tool"])
+                new_unit = st.text_input("Fixture no (Fixture) / Station no (Tool)")
+                new_station_name = st.text_input("Station name")
+            with a3:
+                new_part = st.text_input("Fixture part description")
+                new_check = st.text_input("Check point")
+                new_qty = st.number_input("Qty", min_value=0, value=1, step=1)
+            new_freq = st.number_input("Frequency (cycles)", min_value=1, value=50000, step=1000)
+            new_date = st.date_input("Changed before date", value=dt.date.today(),
+                                     format="DD-MM-YYYY")
+            if st.form_submit_button("Add"):
+                try:
+                    result = apply_master_changes({}, [{
+                        "line": new_line_name if new_line == "New line..." else new_line,
+                        "sub_assembly": new_sa,
+                        "kind": new_kind,
+                        "fixture_no": new_unit if new_kind == "Fixture" else "",
+                        "station_no": new_unit if new_kind != "Fixture" else "",
+                        "station_name": new_station_name,
+                        "fixture_part_desc": new_part,
+                        "check_point": new_check,
+                        "qty": new_qty,
+                        "frequency_cycles": new_freq,
+                        DATE_COL: new_date,
+                        "retired": False,
+                    }], author=st.session_state.get("employee_id", ""))
+                except ValueError as e:
+                    st.error(f"Not added: {e}")
+                else:
+                    st.session_state["cfg_saved"] = f"Added check point as row {result['added'][0]}."
+                    st.rerun()
+
+    with st.expander("Server session memory"):
+        usage = session_report()
+        st.write(
+            f"{len(usage['sessions'])} sessions, {usage['total_kb']} KB of "
+            f"{usage['cap_kb']} KB cap, {usage['evicted']} evicted"
+        )
+        st.dataframe(usage["sessions"], use_container_width=True, hide_index=True)
+
+# ---------------- PLANNING PAGE ----------------
+elif page == "Planning":
+    st.title("Planning")
+
+    st.subheader("What-if thresholds")
+    w1, w2, w3 = st.columns(3)
+    with w1:
+        plan_line = st.selectbox("Line", ["All lines"] + list_lines(), key="plan_line")
+    with w2:
+        plan_days = st.slider("Days ahead", 7, 120, 30, key="plan_days")
+    with w3:
+        plan_threshold = st.slider("Threshold (cycles)", 500, 20000, THRESHOLD, step=500,
+                                   key="plan_threshold")
+    overrides = {}
+    if st.toggle("Separate threshold per kind", key="plan_per_kind"):
+        k1, k2 = st.columns(2)
+        for col, kind_name in zip((k1, k2), ["Fixture", "Tool"]):
+            with col:
+                overrides[(None, kind_name)] = st.number_input(
+                    f"{kind_name} threshold", 0, 100000, plan_threshold, step=500,
+                    key=f"plan_threshold_{kind_name}",
+                )
+
+    # remaining cycles are sorted once per day and master version; moving a
+    # slider only re-runs the vectorized count
+    plan_lines = None if plan_line == "All lines" else [plan_line]
+    df_work = simulate_workload(plan_threshold, overrides, plan_days, lines=plan_lines)
+    df_now = simulate_workload(THRESHOLD, None, 0, lines=plan_lines)
+    m1, m2, m3 = st.columns(3)
+    with m1:
+        st.metric("Pending today", int(df_work["pending"].iloc[0]),
+                  delta=int(df_work["pending"].iloc[0] - df_now["pending"].iloc[0]),
+                  delta_color="off")
+    with m2:
+        st.metric("Peak pending", int(df_work["pending"].max()))
+    with m3:
+        st.metric("Peak day", str(df_work["pending"].idxmax()))
+    st.bar_chart(df_work.drop(columns="pending"))
+    st.caption(
+        f"Assumes {CYCLES_PER_DAY} cycles per working day and no audits in between; "
+        f"the delta compares with the current {THRESHOLD}-cycle threshold."
+    )
+
+    st.divider()
+    st.subheader("Audit plan")
+    s1, s2, s3, s4 = st.columns(4)
+    with s1:
+        plan_weeks = st.number_input("Weeks", 1, 12, 4, key="plan_weeks")
+    with s2:
+        plan_auditors = st.number_input("Auditors per shift", 1, 20, 1, key="plan_auditors")
+    with s3:
+        plan_rate = st.number_input("Audits per auditor per shift", 1, 50, 4, key="plan_rate")
+    with s4:
+        plan_shifts = st.number_input("Shifts per day", 1, 3, 2, key="plan_shifts")
+
+    # one audit per fixture/station; re-planned from the cached cycles
+    # table, so it reflects every save on the next view
+    df_plan, daily_cap = plan_audits(
+        7 * plan_weeks, plan_auditors, plan_rate, plan_shifts, lines=plan_lines
+    )
+    full_cap = plan_auditors * plan_rate * plan_shifts
+    p1, p2, p3 = st.columns(3)
+    with p1:
+        st.metric("Audits in horizon", len(df_plan))
+    with p2:
+        st.metric("Audits per day", f"{daily_cap} of {full_cap}")
+    with p3:
+        st.metric("Late or unplanned", int(df_plan["late"].sum()))
+    if df_plan.empty:
+        st.write("Nothing falls due within the horizon.")
+    else:
+        df_load = df_plan.dropna(subset=["day"]).pivot_table(
+            index="day", columns="line", values="due_points", aggfunc="size", fill_value=0
+        )
+        st.bar_chart(df_load)
+        st.dataframe(df_plan.drop(columns="row_ids"), use_container_width=True, hide_index=True)
+
 
 # ---------------- AUDIT HISTORY PAGE ----------------
 elif page == "Audit History":
     st.title("Audit History")
-    if os.path.exists(HISTORY_PATH):
-        df_hist = pd.read_csv(HISTORY_PATH)
-        if df_hist.empty:
-            st.write("No audits recorded yet.")
+
+    # older months sit in compressed archives and are only read on request;
+    # the search index covers the hot months only
+    archived_months = sorted(read_archive_summary()["months"], reverse=True)
+    query = st.text_input("Search check points, part descriptions and remarks")
+    if archived_months:
+        st.caption(f"Archived months (up to {archived_months[0]}) are not searched.")
+    if query.strip():
+        t0 = dt.datetime.now()
+        df_hits = get_search_index(HISTORY_PATH).search(query)
+        elapsed_ms = (dt.datetime.now() - t0).total_seconds() * 1000
+        st.caption(f"{len(df_hits)} hits in {elapsed_ms:.0f} ms")
+        st.dataframe(df_hits, use_container_width=True, hide_index=True)
+        st.divider()
+
+    with st.expander("Export report"):
+        scope = st.radio("Report for", ["Audit No", "Line", "Month"], horizontal=True)
+        exp_audit_no = exp_line = exp_month = None
+        if scope == "Audit No":
+            exp_audit_no = st.number_input("Audit No", min_value=1, step=1)
+        elif scope == "Line":
+            exp_line = st.selectbox("Line", list_lines())
         else:
-            for i, row in df_hist.iterrows():
-                c_sn, c_aud, c_fix, c_line, c_stat, c_rem, c_img = st.columns(
-                    [1.1, 1.1, 4.0, 1.5, 1.2, 3.0, 2.0]
+            exp_month = st.text_input("Month (YYYY-MM)", dt.date.today().strftime("%Y-%m"))
+        fmt = st.radio("Format", ["Excel", "PDF"], horizontal=True)
+
+        if st.button("Generate report"):
+            try:
+                report_path, n_rows = export_report(
+                    "xlsx" if fmt == "Excel" else "pdf",
+                    HISTORY_PATH,
+                    IMAGES_DIR,
+                    audit_no=exp_audit_no,
+                    line=exp_line,
+                    month=exp_month,
                 )
-                with c_sn:
-                    st.write(i + 1)
-                with c_aud:
-                    st.write(f"#{row.get('audit_no', '')}")
-                with c_fix:
-                    fixture_desc = row.get("fixture_part_desc", "")
-                    st.write(f"Fixture: {fixture_desc if fixture_desc else 'N/A'}")
-                with c_line:
-                    st.write(f"{row.get('line', '')}")
-                with c_stat:
-                    st.write(f"Status: {row.get('status', '')}")
-                with c_rem:
-                    remarks = row.get("remarks", "")
-                    st.write(f"Remarks: {remarks if remarks else 'N/A'}")
-                with c_img:
-                    img_path = str(row.get("image_info", ""))
-                    if img_path and os.path.exists(img_path):
-                        if st.button("📷 View Image", key=f"hist_view_{i}"):
-                            st.image(
-                                img_path,
-                                caption=f"Audit {row.get('audit_no', '')} - {row.get('fixture_part_desc', '')}",
-                            )
-                    else:
-                        st.write("No image")
-                st.divider()
-    else:
+            except RuntimeError as e:
+                st.error(str(e))
+            else:
+                st.success(f"{n_rows} history rows written to {report_path}")
+                with open(report_path, "rb") as f:
+                    st.download_button(
+                        "Download report", f, file_name=os.path.basename(report_path)
+                    )
+
+    with st.expander("Reliability analytics"):
+        # read from the rollup kept up to date on every save, never from history
+        rollup_months = sorted(load_rollup()["month"].unique(), reverse=True)
+        r1, r2 = st.columns(2)
+        with r1:
+            rel_months = st.multiselect("Months (all when empty)", rollup_months, key="rel_months")
+        with r2:
+            rel_line = st.selectbox("Line", ["All lines"] + list_lines(), key="rel_line")
+        df_rel = point_summary(rel_months, None if rel_line == "All lines" else rel_line)
+        if df_rel.empty:
+            st.write("No audits rolled up yet.")
+        else:
+            st.caption(
+                f"{int(df_rel['audits'].sum())} check point audits, "
+                f"{int(df_rel['failures'].sum())} failures"
+            )
+            st.dataframe(df_rel, use_container_width=True, hide_index=True)
+
+    hist_from = "Current months"
+    if archived_months:
+        hist_from = st.selectbox("Show history from", ["Current months"] + archived_months)
+    df_hist = load_history(since=None if hist_from == "Current months" else hist_from)
+    if df_hist.empty:
         st.write("No audits recorded yet.")
+    else:
+        manifest = get_image_manifest(IMAGES_DIR)
+        for i, row in df_hist.iterrows():
+            c_sn, c_aud, c_fix, c_line, c_stat, c_rem, c_img = st.columns(
+                [1.1, 1.1, 4.0, 1.5, 1.2, 3.0, 2.0]
+            )
+            with c_sn:
+                st.write(i + 1)
+            with c_aud:
+                st.write(f"#{row.get('audit_no', '')}")
+            with c_fix:
+                fixture_desc = row.get("fixture_part_desc", "")
+                st.write(f"Fixture: {fixture_desc if fixture_desc else 'N/A'}")
+            with c_line:
+                st.write(f"{row.get('line', '')}")
+            with c_stat:
+                st.write(f"Status: {row.get('status', '')}")
+            with c_rem:
+                remarks = row.get("remarks", "")
+                st.write(f"Remarks: {remarks if remarks else 'N/A'}")
+            with c_img:
+                img_path = str(row.get("image_info", ""))
+                if manifest.has_image(img_path):
+                    if st.button("📷 View Image", key=f"hist_view_{i}"):
+                        st.image(
+                            manifest.resolve(img_path),
+                            caption=f"Audit {row.get('audit_no', '')} - {row.get('fixture_part_desc', '')}",
+                        )
+                else:
+                    st.write("No image")
+            st.divider()
@@ -0,0 +1,1295 @@
+import datetime as dt
+import hashlib
+import heapq
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# ---------------- SHARED DATA LAYER ----------------
+# Streamlit re-executes the page scripts on every rerun, but imported
+# modules live for the whole server process. Everything parsed or computed
+# here is cached per file signature (mtime + size), so all sessions and the
+# HTTP API share one copy and only pay again after the files change.
+#
+# Several server processes may share one data directory (set
+# FIXTURE_AUDIT_DATA_DIR). Writers take a file lock and bump a counter in
+# DATA_DIR/data_version; readers compare that counter on every call and
+# drop their caches when another process has written. File signatures are
+# still checked too, for edits made outside the app.
+DATA_DIR = os.environ.get("FIXTURE_AUDIT_DATA_DIR", ".")
+MASTER_PATH = os.path.join(DATA_DIR, "config_master.csv")
+HISTORY_PATH = os.path.join(DATA_DIR, "audit_history.csv")
+IMAGES_DIR = os.path.join(DATA_DIR, "images")
+VERSION_PATH = os.path.join(DATA_DIR, "data_version")
+AUDIT_NO_PATH = os.path.join(DATA_DIR, "last_audit_no")  # numbers handed out so far
+LOCK_PATH = os.path.join(DATA_DIR, ".write.lock")
+
+# Current frequency and remaining cycles of every row, materialized once
+# per day (and patched on save) next to the master. A sharded master gets
+# one file per line, keyed by its shard version, so line-scoped pages
+# never load the other shards.
+CYCLES_PATH = os.path.join(DATA_DIR, "current_cycles.parquet")
+CYCLES_DIR = os.path.join(DATA_DIR, "current_cycles")
+
+# Months of history kept in the hot audit_history.csv (this month and the
+# previous one by default); older months move to gzip archives with a small
+# summary, and archives past the retention period are deleted.
+ARCHIVE_DIR = os.path.join(DATA_DIR, "history_archive")
+ARCHIVE_SUMMARY_PATH = os.path.join(ARCHIVE_DIR, "summary.json")
+HOT_MONTHS = int(os.environ.get("FIXTURE_AUDIT_HOT_MONTHS", "2"))
+RETENTION_MONTHS = int(os.environ.get("FIXTURE_AUDIT_RETENTION_MONTHS", "36"))
+
+# Optional sharded master: one CSV per line plus a small catalog. When the
+# catalog exists it is the source of truth and config_master.csv is unused.
+SHARD_DIR = os.path.join(DATA_DIR, "config_shards")
+CATALOG_PATH = os.path.join(SHARD_DIR, "catalog.json")
+
+DATE_COL = "Changed before date"
+THRESHOLD = 5000  # cycles
+CYCLES_PER_DAY = 1800
+
+_lock = threading.RLock()
+_master_cache = {"sig": None, "df": None}
+_catalog_cache = {"sig": None, "catalog": None}
+_shard_cache = {}  # line -> (shard version, parsed shard)
+_combined_cache = {}  # ((line, version), ...) -> concatenated shards
+_due_cache = {}  # (master sig, counts sig, day, lines) -> due rows
+_due_groups_cache = {}  # same key -> due rows grouped per fixture/station
+_history_cache = {"sig": None, "stats": None}
+_summary_cache = {"sig": None, "summary": None}
+_cycles_cache = {}  # line ("" for an unsharded master) -> (key, cycles table)
+_hierarchy_cache = {}  # line -> (shard version or master signature, tree)
+_workload_cache = {}  # line ("" unsharded) -> (cycles key, sorted remaining per group)
+_plan_cache = {}  # (cycles key, lines, plan parameters) -> (plan, daily cap)
+_seen_version = {"version": None}
+
+
+def file_signature(path: str):
+    if not os.path.exists(path):
+        return None
+    st_ = os.stat(path)
+    return (st_.st_mtime_ns, st_.st_size)
+
+
+def is_sharded() -> bool:
+    return os.path.exists(CATALOG_PATH)
+
+
+def master_signature():
+    """Every shard write also rewrites the catalog, so one stat covers all shards."""
+    return file_signature(CATALOG_PATH) if is_sharded() else file_signature(MASTER_PATH)
+
+
+def data_version() -> str:
+    """Short token that changes whenever the master or the history changes."""
+    raw = repr((read_write_counter(), master_signature(), file_signature(HISTORY_PATH)))
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def _write_atomic(write, path: str, target: str = None):
+    """Write via `write(tmp_path)` and rename into place; `target` labels the bytes metric."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    write(tmp_path)
+    if target:
+        metrics.inc("fixture_audit_bytes_written_total", os.path.getsize(tmp_path), target=target)
+    os.replace(tmp_path, path)
+
+
+# ---------- CROSS-PROCESS VERSIONING ----------
+def _read_int(path: str) -> int:
+    try:
+        with open(path) as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def _write_int(path: str, value: int):
+    def write(p):
+        with open(p, "w") as f:
+            f.write(str(value))
+    _write_atomic(write, path)
+
+
+def read_write_counter() -> int:
+    """Number of writes made to DATA_DIR by any process, 0 before the first."""
+    return _read_int(VERSION_PATH)
+
+
+def _sync_caches():
+    """Drop every cached frame if another process has written since we last looked."""
+    version = read_write_counter()
+    if version == _seen_version["version"]:
+        return
+    _master_cache.update(sig=None, df=None)
+    # shards are cached per catalog version, so re-reading the catalog is
+    # enough to reload just the shards another process rewrote
+    _catalog_cache.update(sig=None, catalog=None)
+    _due_cache.clear()
+    _due_groups_cache.clear()
+    _history_cache.update(sig=None, stats=None)
+    _summary_cache.update(sig=None, summary=None)
+    _cycles_cache.clear()
+    _hierarchy_cache.clear()
+    _workload_cache.clear()
+    _plan_cache.clear()
+    _seen_version["version"] = version
+
+
+@contextmanager
+def write_lock():
+    """Serialize writers across threads and across processes sharing DATA_DIR.
+
+    Caches are brought up to date on entry, so a writer always starts from
+    what other replicas have saved, and the write counter is bumped on exit.
+    """
+    with _lock:
+        with open(LOCK_PATH, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                _sync_caches()
+                yield
+                version = read_write_counter() + 1
+                _write_int(VERSION_PATH, version)
+                _seen_version["version"] = version
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                else:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# ---------- MASTER CONFIG ----------
+def _normalize_master(df_cfg: pd.DataFrame) -> pd.DataFrame:
+    for col in ["qty", "frequency_cycles"]:
+        if col in df_cfg.columns:
+            df_cfg[col] = pd.to_numeric(df_cfg[col], errors="coerce").fillna(0).astype(int)
+
+    if DATE_COL in df_cfg.columns:
+        df_cfg[DATE_COL] = pd.to_datetime(
+            df_cfg[DATE_COL].astype(str).str.strip(),
+            format="%d-%m-%Y",
+            errors="coerce",
+        ).dt.date
+
+    df_cfg["line"] = df_cfg["line"].astype(str)
+    df_cfg["sub_assembly"] = df_cfg["sub_assembly"].astype(str)
+    df_cfg["kind"] = df_cfg["kind"].astype(str)
+
+    # retired check points stay in the master, so row ids and history keep
+    # pointing at them, but they are never due or listed for audit again
+    retired = df_cfg["retired"] if "retired" in df_cfg.columns else "False"
+    df_cfg["retired"] = (
+        pd.Series(retired, index=df_cfg.index).astype(str).str.strip().str.lower()
+        .isin(["true", "1", "yes"])
+    )
+    return df_cfg
+
+
+@metrics.timed("fixture_audit_master_load_seconds")
+def _read_master(path: str) -> pd.DataFrame:
+    return _normalize_master(pd.read_csv(path))
+
+
+def _to_csv_frame(df_cfg: pd.DataFrame) -> pd.DataFrame:
+    df_to_save = df_cfg.copy()
+    df_to_save[DATE_COL] = pd.to_datetime(
+        df_to_save[DATE_COL], errors="coerce"
+    ).dt.strftime("%d-%m-%Y")
+    df_to_save[DATE_COL] = df_to_save[DATE_COL].fillna("")
+    return df_to_save
+
+
+def _write_master(df_cfg: pd.DataFrame):
+    df_to_save = _to_csv_frame(df_cfg)
+    _write_atomic(lambda p: df_to_save.to_csv(p, index=False), MASTER_PATH, "config_master")
+
+
+# ----- shards -----
+def _read_catalog() -> dict:
+    sig = file_signature(CATALOG_PATH)
+    if sig != _catalog_cache["sig"]:
+        with open(CATALOG_PATH) as f:
+            _catalog_cache["catalog"] = json.load(f)
+        _catalog_cache["sig"] = sig
+    return _catalog_cache["catalog"]
+
+
+def _write_catalog(catalog: dict):
+    def write(p):
+        with open(p, "w") as f:
+            json.dump(catalog, f, indent=2)
+    _write_atomic(write, CATALOG_PATH)
+
+
+def _shard_file_name(line: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", line) + ".csv"
+
+
+def _load_shard(line: str) -> pd.DataFrame:
+    entry = _read_catalog()["shards"][line]
+    cached = _shard_cache.get(line)
+    if cached is not None and cached[0] == entry["version"]:
+        return cached[1]
+    with metrics.timed("fixture_audit_master_load_seconds"):
+        df = pd.read_csv(os.path.join(SHARD_DIR, entry["file"]), index_col="row_id")
+        df.index.name = None
+        df = _normalize_master(df)
+    _shard_cache[line] = (entry["version"], df)
+    return df
+
+
+def _write_shard(line: str, df_shard: pd.DataFrame, catalog: dict):
+    entry = catalog["shards"].setdefault(
+        line, {"file": _shard_file_name(line), "rows": 0, "version": 0}
+    )
+    df_to_save = _to_csv_frame(df_shard)
+    df_to_save.insert(0, "row_id", df_to_save.index)
+    _write_atomic(
+        lambda p: df_to_save.to_csv(p, index=False),
+        os.path.join(SHARD_DIR, entry["file"]),
+        "config_master",
+    )
+    entry["rows"] = len(df_shard)
+    entry["version"] += 1
+    _shard_cache[line] = (entry["version"], df_shard)
+
+
+def shard_master():
+    """Split config_master.csv into one shard per line plus catalog.json."""
+    df_cfg = _read_master(MASTER_PATH)
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    catalog = {"columns": list(df_cfg.columns), "shards": {},
+               "next_row_id": int(df_cfg.index.max()) + 1 if len(df_cfg) else 0}
+    with write_lock():
+        for line, df_shard in df_cfg.groupby("line", sort=True):
+            _write_shard(line, df_shard, catalog)
+        _write_catalog(catalog)
+    return catalog
+
+
+def list_lines() -> list:
+    """All lines, from the catalog alone when the master is sharded."""
+    with _lock:
+        _sync_caches()
+        if is_sharded():
+            return sorted(_read_catalog()["shards"])
+        return sorted(load_master()["line"].unique())
+
+
+def load_master(lines: list = None) -> pd.DataFrame:
+    """Parsed master (or just the given lines), shared by every caller.
+
+    Treat the result as read-only. Row ids are stable across shards.
+    """
+    with _lock:
+        _sync_caches()
+        if not is_sharded():
+            sig = file_signature(MASTER_PATH)
+            if _master_cache["df"] is None or sig != _master_cache["sig"]:
+                _master_cache["df"] = _read_master(MASTER_PATH)
+                _master_cache["sig"] = sig
+            df_cfg = _master_cache["df"]
+            return df_cfg if lines is None else df_cfg[df_cfg["line"].isin(lines)]
+
+        shards = _read_catalog()["shards"]
+        wanted = sorted(shards) if lines is None else [l for l in lines if l in shards]
+        if len(wanted) == 1:
+            return _load_shard(wanted[0])
+
+        key = tuple((line, shards[line]["version"]) for line in wanted)
+        if key not in _combined_cache:
+            if len(_combined_cache) >= 16:
+                _combined_cache.clear()
+            frames = [_load_shard(line) for line in wanted]
+            if frames:
+                df_cfg = pd.concat(frames).sort_index()
+            else:
+                df_cfg = pd.DataFrame(columns=_read_catalog()["columns"])
+            _combined_cache[key] = df_cfg
+        return _combined_cache[key]
+
+
+def hierarchy(line: str) -> dict:
+    """sub assembly -> kind -> fixture/station no -> row ids of one line, in master order.
+
+    Built once per shard (or master) version over the active (not retired)
+    rows, from that line's shard only, so the Components selectors are
+    dictionary lookups instead of frame scans.
+    """
+    with _lock:
+        _sync_caches()
+        if is_sharded():
+            shards = _read_catalog()["shards"]
+            if line not in shards:
+                return {}
+            version = shards[line]["version"]
+        else:
+            version = master_signature()
+        cached = _hierarchy_cache.get(line)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        df_cfg = load_master([line])
+        df_cfg = df_cfg[~df_cfg["retired"]]
+        unit = df_cfg["fixture_no"].where(df_cfg["kind"] == "Fixture", df_cfg["station_no"])
+        keys = [df_cfg["sub_assembly"], df_cfg["kind"], unit.rename("unit")]
+        tree = {}
+        for (sa, kind, unit_no), ids in df_cfg.groupby(keys, sort=False).groups.items():
+            tree.setdefault(sa, {}).setdefault(kind, {})[str(unit_no)] = list(ids)
+        _hierarchy_cache[line] = (version, tree)
+        return tree
+
+
+def filter_master(lines: list = None, filters: dict = None, unit_text: str = "") -> pd.Index:
+    """Row ids matching exact column `filters` and a fixture/station substring.
+
+    Returns ids only, so pages can count matches and slice out one page
+    without copying the rest of the master.
+    """
+    df_cfg = load_master(lines)
+    mask = np.ones(len(df_cfg), dtype=bool)
+    for col, value in (filters or {}).items():
+        if value is not None and col in df_cfg.columns:
+            mask &= (df_cfg[col].astype(str) == str(value)).to_numpy()
+    unit_text = unit_text.strip()
+    if unit_text:
+        units = (df_cfg["fixture_no"].fillna("").astype(str) + " "
+                 + df_cfg["station_no"].fillna("").astype(str))
+        mask &= units.str.contains(unit_text, case=False, regex=False).to_numpy()
+    return df_cfg.index[mask]
+
+
+@metrics.timed("fixture_audit_save_seconds", target="config_master")
+def save_master_dates(date_updates: dict):
+    """Set "Changed before date" for the given row ids and persist the master.
+
+    With a sharded master only the shards holding those rows are rewritten.
+    """
+    if not date_updates:
+        return
+    with write_lock():
+        fresh = _fresh_cycles(dt.date.today())
+        touched = _update_master_rows({idx: {DATE_COL: d} for idx, d in date_updates.items()},
+                                      source="audit")
+        _patch_cycles(fresh, touched)
+
+
+def _update_master_rows(updates: dict, new_rows: pd.DataFrame = None,
+                        source: str = "") -> pd.DataFrame:
+    """Apply {row id: {column: value}}, append `new_rows`; returns the touched rows.
+
+    Caller holds write_lock(). Every changed row also goes to the change
+    feed, tagged with `source`.
+    """
+    import change_feed  # imports this module
+
+    touched = _write_master_rows(updates, new_rows)
+    events = [{"entity": "master", "op": "update", "row_id": idx, "source": source,
+               "data": cells} for idx, cells in updates.items()]
+    if new_rows is not None:
+        events += change_feed.row_events("master", "insert", new_rows, source)
+    change_feed.emit(events)
+    return touched
+
+
+def _write_master_rows(updates: dict, new_rows: pd.DataFrame = None) -> pd.DataFrame:
+    """Persist the changes of _update_master_rows.
+
+    With a sharded master only the shards owning the rows, or receiving new
+    ones, are rewritten.
+    """
+    if new_rows is None:
+        new_rows = pd.DataFrame()
+    if not is_sharded():
+        df_cfg = load_master().copy()
+        for idx, cells in updates.items():
+            for col, value in cells.items():
+                df_cfg.at[idx, col] = value
+        if len(new_rows):
+            df_cfg = pd.concat([df_cfg, new_rows])
+        _write_master(df_cfg)
+        _master_cache["df"] = df_cfg
+        _master_cache["sig"] = file_signature(MASTER_PATH)
+        return df_cfg.loc[list(updates) + list(new_rows.index)]
+
+    catalog = _read_catalog()
+    remaining = dict(updates)
+    adds = dict(tuple(new_rows.groupby("line"))) if len(new_rows) else {}
+    touched = []
+    # shards already in memory are the likeliest owners of the rows
+    lines = sorted(catalog["shards"], key=lambda l: l not in _shard_cache)
+    for line in lines:
+        if not remaining and not any(l in catalog["shards"] for l in adds):
+            break
+        df_shard = _load_shard(line)
+        hits = [idx for idx in remaining if idx in df_shard.index]
+        if not hits and line not in adds:
+            continue
+        df_shard = df_shard.copy()
+        for idx in hits:
+            for col, value in remaining.pop(idx).items():
+                df_shard.at[idx, col] = value
+        if line in adds:
+            df_shard = pd.concat([df_shard, adds.pop(line)])
+        _write_shard(line, df_shard, catalog)
+        touched.append(df_shard.loc[hits])
+    for line, df_new in adds.items():  # first rows of a new line
+        _write_shard(line, df_new, catalog)
+    if len(new_rows):
+        touched.append(new_rows)
+    _write_catalog(catalog)
+    return pd.concat(touched) if touched else new_rows
+
+
+def _next_row_id() -> int:
+    if not is_sharded():
+        df_cfg = load_master()
+        return int(df_cfg.index.max()) + 1 if len(df_cfg) else 0
+    catalog = _read_catalog()
+    if "next_row_id" not in catalog:  # catalogs written before row adds existed
+        df_cfg = load_master()
+        catalog["next_row_id"] = int(df_cfg.index.max()) + 1 if len(df_cfg) else 0
+    return catalog["next_row_id"]
+
+
+def _locate_rows(row_ids: list) -> pd.DataFrame:
+    """Current master rows for `row_ids`, loading as few shards as possible."""
+    if not is_sharded():
+        df_cfg = load_master()
+        return df_cfg.loc[[i for i in row_ids if i in df_cfg.index]]
+    wanted, found = set(row_ids), []
+    for line in sorted(_read_catalog()["shards"], key=lambda l: l not in _shard_cache):
+        if not wanted:
+            break
+        df_shard = _load_shard(line)
+        hits = [i for i in wanted if i in df_shard.index]
+        if hits:
+            found.append(df_shard.loc[hits])
+            wanted -= set(hits)
+    return pd.concat(found) if found else pd.DataFrame()
+
+
+# ----- row-level edits -----
+CHANGE_LOG_PATH = os.path.join(DATA_DIR, "master_changes.csv")
+EDITABLE_COLUMNS = ["station_name", "fixture_part_desc", "check_point", "qty",
+                    "frequency_cycles", DATE_COL, "retired"]
+NEW_ROW_COLUMNS = ["line", "sub_assembly", "kind", "fixture_no", "station_no"] + EDITABLE_COLUMNS
+
+
+def _clean_cell(col: str, value):
+    """Validated, normalized value for a master cell; raises ValueError."""
+    if col in ("qty", "frequency_cycles"):
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            number = float("nan")
+        lowest = 1 if col == "frequency_cycles" else 0
+        if number != number or number != int(number) or number < lowest:
+            raise ValueError(f"{col} must be a whole number of at least {lowest}")
+        return int(number)
+    if col == DATE_COL:
+        if value is None or (isinstance(value, float) and value != value) or value == "":
+            return None
+        if isinstance(value, dt.datetime):
+            return value.date()
+        if isinstance(value, dt.date):
+            return value
+        for fmt in ("%Y-%m-%d", "%d-%m-%Y"):
+            try:
+                return dt.datetime.strptime(str(value)[:10], fmt).date()
+            except ValueError:
+                pass
+        raise ValueError(f"{DATE_COL} must be a date (DD-MM-YYYY)")
+    if col == "retired":
+        if isinstance(value, str):
+            return value.strip().lower() in ("true", "1", "yes")
+        return bool(value)
+    text = "" if value is None else str(value).strip()
+    if col in ("line", "sub_assembly", "kind", "check_point") and not text:
+        raise ValueError(f"{col} must not be empty")
+    return text
+
+
+def _log_value(value) -> str:
+    if isinstance(value, dt.date):
+        return value.strftime("%d-%m-%Y")
+    return "" if value is None or (isinstance(value, float) and value != value) else str(value)
+
+
+@metrics.timed("fixture_audit_save_seconds", target="master_changes")
+def apply_master_changes(updates: dict, additions: list = (), author: str = "") -> dict:
+    """Validate and persist edited master cells and new check points.
+
+    `updates` maps row id -> {column: value} holding only the edited cells;
+    retiring a check point is an update of its "retired" cell. `additions`
+    are dicts over NEW_ROW_COLUMNS. Every effective change is appended to
+    master_changes.csv row by row. Raises ValueError listing all invalid
+    cells, in which case nothing is written.
+    """
+    errors, cleaned, new_rows = [], {}, []
+    for row_id, cells in updates.items():
+        for col, value in cells.items():
+            if col not in EDITABLE_COLUMNS:
+                errors.append(f"row {row_id}: {col} cannot be edited")
+                continue
+            try:
+                cleaned.setdefault(row_id, {})[col] = _clean_cell(col, value)
+            except ValueError as e:
+                errors.append(f"row {row_id}: {e}")
+    for n, rec in enumerate(additions, start=1):
+        row = {}
+        for col in NEW_ROW_COLUMNS:
+            try:
+                row[col] = _clean_cell(col, rec.get(col))
+            except ValueError as e:
+                errors.append(f"new row {n}: {e}")
+        unit_col = "fixture_no" if row.get("kind") == "Fixture" else "station_no"
+        if not row.get(unit_col):
+            errors.append(f"new row {n}: {unit_col} must not be empty for kind {row.get('kind')}")
+        new_rows.append(row)
+
+    now = dt.datetime.now().isoformat(timespec="seconds")
+    with write_lock():
+        df_old = _locate_rows(list(cleaned))
+        errors += [f"row {i}: no such row" for i in cleaned if i not in df_old.index]
+        if errors:
+            raise ValueError("; ".join(errors))
+
+        log, effective = [], {}
+        for row_id, cells in cleaned.items():
+            for col, value in cells.items():
+                old = df_old.at[row_id, col] if col in df_old.columns else None
+                if _log_value(old) == _log_value(value):
+                    continue  # edited back to what it was
+                effective.setdefault(row_id, {})[col] = value
+                action = "modify"
+                if col == "retired":
+                    action = "retire" if value else "restore"
+                log.append([now, author, row_id, action, col, _log_value(old), _log_value(value)])
+
+        df_new = pd.DataFrame(new_rows)
+        if len(df_new):
+            first = _next_row_id()
+            df_new.index = pd.RangeIndex(first, first + len(df_new))
+            if is_sharded():
+                _read_catalog()["next_row_id"] = first + len(df_new)
+            for row_id, rec in df_new.iterrows():
+                log.append([now, author, row_id, "add", "", "", rec["check_point"]])
+        if not log:
+            return {"modified": 0, "added": [], "retired": 0}
+
+        fresh = _fresh_cycles(dt.date.today())
+        touched = _update_master_rows(effective, df_new if len(df_new) else None, source="edit")
+        _patch_cycles(fresh, touched)
+
+        df_log = pd.DataFrame(log, columns=["timestamp", "author", "row_id", "action",
+                                            "column", "old_value", "new_value"])
+        df_log.to_csv(CHANGE_LOG_PATH, mode="a", header=not os.path.exists(CHANGE_LOG_PATH),
+                      index=False)
+    return {
+        "modified": len([r for r in effective
+                         if any(c != "retired" for c in effective[r])]),
+        "added": list(df_new.index),
+        "retired": sum(1 for r in effective if effective[r].get("retired") is True),
+    }
+
+
+# ---------- DUE ITEMS ----------
+def working_cycles_from_date(change_date: dt.date, today: dt.date) -> int:
+    if not isinstance(change_date, dt.date):
+        return 0
+    d = change_date
+    days = 0
+    step = dt.timedelta(days=1)
+    while d < today:
+        if d.weekday() != 6:  # Sunday
+            days += 1
+        d += step
+    return days * CYCLES_PER_DAY
+
+
+def working_cycles_series(dates: pd.Series, today: dt.date) -> np.ndarray:
+    """Vectorized working_cycles_from_date for a column of change dates."""
+    days = pd.to_datetime(dates, errors="coerce").to_numpy(dtype="datetime64[D]")
+    valid = ~np.isnat(days)
+    out = np.zeros(len(days), dtype=np.int64)
+    out[valid] = np.busday_count(days[valid], np.datetime64(today, "D"), weekmask="1111110")
+    return np.clip(out, 0, None) * CYCLES_PER_DAY
+
+
+# ----- materialized cycles -----
+def _cycles_parts(lines: list = None) -> list:
+    """Cycles tables covering `lines`: "" (the whole master) unless sharded."""
+    if not is_sharded():
+        return [""]
+    shards = _read_catalog()["shards"]
+    return sorted(shards) if lines is None else [l for l in lines if l in shards]
+
+
+def _cycles_key(today: dt.date, part: str = "") -> dict:
+    import cycle_counters  # imports this module
+
+    key = {"day": today.isoformat(), "counts": repr(cycle_counters.counts_signature())}
+    if part:
+        key.update(line=part, shard=_read_catalog()["shards"][part]["version"])
+    else:
+        key["master"] = repr(master_signature())
+    return key
+
+
+def _cycles_version(today: dt.date, lines: list = None) -> str:
+    """Token that changes with any cycles table covering `lines`."""
+    return json.dumps([_cycles_key(today, part) for part in _cycles_parts(lines)],
+                      sort_keys=True)
+
+
+def _cycles_path(part: str) -> str:
+    if not part:
+        return CYCLES_PATH
+    return os.path.join(CYCLES_DIR, _shard_file_name(part)[: -len(".csv")] + ".parquet")
+
+
+def _compute_cycles(df_cfg: pd.DataFrame, today: dt.date) -> pd.DataFrame:
+    import cycle_counters
+
+    cycles, sources = cycle_counters.current_cycles(df_cfg, today)
+    df = pd.DataFrame(
+        {"current_frequency": np.asarray(cycles, dtype=np.int64), "cycles_source": sources},
+        index=df_cfg.index,
+    )
+    df["remaining_cycles"] = df_cfg["frequency_cycles"].to_numpy() - df["current_frequency"]
+    return df
+
+
+def _write_cycles(df: pd.DataFrame, key: dict, path: str):
+    table = pa.Table.from_pandas(df)
+    meta = dict(table.schema.metadata or {})
+    meta[b"fixture_audit"] = json.dumps(key).encode()
+    table = table.replace_schema_metadata(meta)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    _write_atomic(lambda p: pq.write_table(table, p), path)
+
+
+def _read_cycles(key: dict, path: str):
+    """The persisted table if it was materialized for `key`, else None."""
+    if not os.path.exists(path):
+        return None
+    table = pq.read_table(path)
+    stored = (table.schema.metadata or {}).get(b"fixture_audit")
+    if stored is None or json.loads(stored) != key:
+        return None
+    return table.to_pandas()
+
+
+def _part_cycles(today: dt.date, part: str) -> pd.DataFrame:
+    key = _cycles_key(today, part)
+    cached = _cycles_cache.get(part)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    path = _cycles_path(part)
+    df = _read_cycles(key, path)
+    if df is None:
+        df = _compute_cycles(load_master([part] if part else None), today)
+        _write_cycles(df, key, path)
+    _cycles_cache[part] = (key, df)
+    return df
+
+
+def current_cycles_table(today: dt.date = None, lines: list = None) -> pd.DataFrame:
+    """current_frequency, remaining_cycles and cycles_source per row id.
+
+    Computed at most once per day, master (or shard) version and counter
+    ingest, and shared through the files under DATA_DIR, so pages and
+    replicas only read it. `lines` limits the shards touched; an unsharded
+    master always yields the whole table.
+    """
+    today = today or dt.date.today()
+    with _lock:
+        _sync_caches()
+        frames = [_part_cycles(today, part) for part in _cycles_parts(lines)]
+        if len(frames) == 1:
+            return frames[0]
+        if not frames:
+            return pd.DataFrame(columns=["current_frequency", "cycles_source",
+                                         "remaining_cycles"])
+        return pd.concat(frames).sort_index()
+
+
+def _fresh_cycles(today: dt.date) -> tuple:
+    """(today, cached tables still current); taken before a save changes the master."""
+    parts = set(_cycles_parts())
+    return today, {part for part, (key, _) in _cycles_cache.items()
+                   if part in parts and key == _cycles_key(today, part)}
+
+
+def _patch_cycles(fresh: tuple, df_touched: pd.DataFrame):
+    """After a save, recompute only the touched rows of today's tables."""
+    today, parts = fresh
+    if not len(df_touched):
+        return
+    groups = dict(tuple(df_touched.groupby("line"))) if is_sharded() else {"": df_touched}
+    for part, df_part in groups.items():
+        if part not in parts:
+            continue  # nothing current to patch; the next read materializes afresh
+        df_rows = _compute_cycles(df_part, today)
+        df = pd.concat([_cycles_cache[part][1].drop(df_rows.index, errors="ignore"), df_rows])
+        df = df.sort_index()
+        key = _cycles_key(today, part)
+        _write_cycles(df, key, _cycles_path(part))
+        _cycles_cache[part] = (key, df)
+
+
+def get_due_items(today: dt.date = None, lines: list = None) -> pd.DataFrame:
+    """Rows within THRESHOLD cycles of their limit, cached per master, counts and day.
+
+    `lines` restricts the computation (and the shards loaded) to those lines.
+    """
+    with metrics.timed("fixture_audit_due_items_seconds"):
+        df_due = _get_due_items(today or dt.date.today(), lines)
+    if lines is None:
+        metrics.set_gauge("fixture_audit_pending_audits", len(df_due))
+    return df_due
+
+
+def _due_key(today: dt.date, lines: list) -> tuple:
+    import cycle_counters  # imports this module
+
+    return (master_signature(), cycle_counters.counts_signature(), today,
+            tuple(lines) if lines is not None else None)
+
+
+def _get_due_items(today: dt.date, lines: list) -> pd.DataFrame:
+    with _lock:
+        _sync_caches()
+        key = _due_key(today, lines)
+        if key in _due_cache:
+            return _due_cache[key]
+        # several screens may watch different lines; keep a few due sets
+        if len(_due_cache) >= 16:
+            _due_cache.clear()
+        df_cfg = load_master(lines)
+
+        df_tmp = df_cfg[(df_cfg["frequency_cycles"] > 0) & ~df_cfg["retired"]]
+        # precomputed for the day: counter totals where reported, else the estimate
+        df_cyc = current_cycles_table(today, lines)
+        df_tmp = df_tmp.join(df_cyc[["current_frequency", "cycles_source"]])
+        diff = df_cyc["remaining_cycles"].reindex(df_tmp.index)
+        df_tmp = df_tmp[diff.between(0, THRESHOLD)]
+        df_tmp = df_tmp.reset_index().rename(columns={"index": "row_id"})
+        df_tmp.insert(0, "S.No", df_tmp.index + 1)
+        df_tmp.insert(1, "Audit No", df_tmp["S.No"])
+
+        _due_cache[key] = df_tmp
+        return df_tmp
+
+
+DUE_GROUP_KEYS = ["line", "sub_assembly", "kind", "unit"]
+
+
+def get_due_groups(today: dt.date = None, lines: list = None) -> pd.DataFrame:
+    """Due rows grouped per (line, sub assembly, kind, fixture/station no).
+
+    One row per group with its due check points ("row_ids", "due_points")
+    and the worst "min_remaining" cycles, most urgent first, so one audit
+    covers everything due on a fixture or station.
+    """
+    today = today or dt.date.today()
+    with _lock:
+        df_due = get_due_items(today, lines)
+        key = _due_key(today, lines)
+        if key in _due_groups_cache:
+            return _due_groups_cache[key]
+        if len(_due_groups_cache) >= 16:
+            _due_groups_cache.clear()
+
+        df = df_due.assign(
+            unit=df_due["fixture_no"].where(df_due["kind"] == "Fixture", df_due["station_no"])
+            .fillna("").astype(str),
+            remaining=df_due["frequency_cycles"] - df_due["current_frequency"],
+        )
+        df_groups = (
+            df.groupby(DUE_GROUP_KEYS, sort=False)
+            .agg(
+                fixture_no=("fixture_no", "first"),
+                station_no=("station_no", "first"),
+                due_points=("row_id", "size"),
+                min_remaining=("remaining", "min"),
+                row_ids=("row_id", list),
+                fixture_part_desc=("fixture_part_desc", "first"),
+            )
+            .reset_index()
+            .sort_values("min_remaining", kind="stable", ignore_index=True)
+        )
+        df_groups.insert(0, "S.No", df_groups.index + 1)
+        df_groups.insert(1, "Audit No", df_groups["S.No"])
+
+        _due_groups_cache[key] = df_groups
+        return df_groups
+
+
+# ----- what-if thresholds -----
+def _remaining_by_group(today: dt.date, lines: list = None) -> dict:
+    """(line, kind) -> sorted remaining cycles of the active rows of `lines`.
+
+    Built per cycles table, so a sharded master only loads the lines asked
+    for, and kept until that table changes.
+    """
+    with _lock:
+        _sync_caches()
+        groups = {}
+        for part in _cycles_parts(lines):
+            key = _cycles_key(today, part)
+            cached = _workload_cache.get(part)
+            if cached is None or cached[0] != key:
+                part_lines = [part] if part else None
+                df_cyc = current_cycles_table(today, part_lines)
+                df_cfg = load_master(part_lines)
+                df_cfg = df_cfg[(df_cfg["frequency_cycles"] > 0) & ~df_cfg["retired"]]
+                remaining = df_cyc["remaining_cycles"].reindex(df_cfg.index).to_numpy(
+                    dtype=np.int64)
+                cached = (key, {
+                    group: np.sort(remaining[pos])
+                    for group, pos in df_cfg.groupby(["line", "kind"], sort=True).indices.items()
+                })
+                _workload_cache[part] = cached
+            groups.update(cached[1])
+        if lines is not None:  # an unsharded master holds every line in one table
+            groups = {group: r for group, r in groups.items() if group[0] in lines}
+        return groups
+
+
+def simulate_workload(threshold: int = THRESHOLD, overrides: dict = None, days: int = 30,
+                      today: dt.date = None, lines: list = None) -> pd.DataFrame:
+    """Pending audits per day for the next `days` days under other thresholds.
+
+    `overrides` maps (line, kind), (line, None) or (None, kind) to a
+    threshold replacing `threshold` for those rows. Every row is assumed to
+    run CYCLES_PER_DAY per working day and not to be audited meanwhile, so
+    a row is pending on a day while 0 <= remaining <= its threshold. Each
+    day costs two binary searches per (line, kind) group, so any threshold
+    set is evaluated without touching the master again.
+    """
+    today = today or dt.date.today()
+    overrides = overrides or {}
+    dates = pd.date_range(today, periods=days + 1, freq="D")
+    used = np.busday_count(np.datetime64(today, "D"), dates.to_numpy(dtype="datetime64[D]"),
+                           weekmask="1111110") * CYCLES_PER_DAY
+
+    result = {}
+    for (line, kind), remaining in _remaining_by_group(today, lines).items():
+        limit = overrides.get((line, kind), overrides.get((line, None),
+                                                          overrides.get((None, kind), threshold)))
+        # pending while used <= remaining <= used + limit
+        pending = (len(remaining) - np.searchsorted(remaining, used, side="left")) - (
+            len(remaining) - np.searchsorted(remaining, used + limit, side="right")
+        )
+        result[kind] = result.get(kind, 0) + pending
+    df = pd.DataFrame(result, index=dates.date)
+    df.index.name = "day"
+    df["pending"] = df.sum(axis=1) if len(df.columns) else 0
+    return df
+
+
+# ----- levelled audit plan -----
+def _edf(release: np.ndarray, deadline: np.ndarray, line: list, work_days: list,
+         cap: int) -> tuple:
+    """Earliest-deadline-first with `cap` audits per working day.
+
+    Returns (day index per job, -1 when it does not fit the horizon; number
+    of jobs done after their deadline or not at all). Ties go to the same
+    line, so one line's audits cluster on the same days.
+    """
+    order = np.argsort(release, kind="stable")
+    day_of = np.full(len(release), -1)
+    heap, i, late = [], 0, 0
+    for d in work_days:
+        while i < len(order) and release[order[i]] <= d:
+            j = order[i]
+            heapq.heappush(heap, (deadline[j], line[j], j))
+            i += 1
+        for _ in range(min(cap, len(heap))):
+            dl, _, j = heapq.heappop(heap)
+            day_of[j] = d
+            late += dl < d
+    return day_of, late + len(heap) + (len(order) - i)
+
+
+def plan_audits(days: int = 28, auditors_per_shift: int = 1, audits_per_auditor: int = 4,
+                shifts_per_day: int = 2, today: dt.date = None, lines: list = None) -> tuple:
+    """Levelled plan of fixture/station audits over the next `days` days.
+
+    Every active row gets a projected due day (its remaining cycles used up
+    at CYCLES_PER_DAY per working day) and a release day (when it enters
+    the THRESHOLD window). Rows are grouped per fixture/station like the
+    due list: one audit, due at its earliest row. The smallest daily
+    capacity that is no later than full capacity is found by bisection,
+    so the load is spread instead of front-loaded, then each day is split
+    into shifts by line. Returns (plan, audits per day used).
+    """
+    today = today or dt.date.today()
+    full_cap = max(1, auditors_per_shift * audits_per_auditor * shifts_per_day)
+    with _lock:
+        df_cyc = current_cycles_table(today, lines)
+        key = (_cycles_version(today, lines),
+               tuple(lines) if lines is not None else None,
+               days, auditors_per_shift, audits_per_auditor, shifts_per_day)
+        if key in _plan_cache:
+            return _plan_cache[key]
+        if len(_plan_cache) >= 16:
+            _plan_cache.clear()
+
+        df_cfg = load_master(lines)
+        df_cfg = df_cfg[(df_cfg["frequency_cycles"] > 0) & ~df_cfg["retired"]]
+        remaining = df_cyc["remaining_cycles"].reindex(df_cfg.index).to_numpy(dtype=np.int64)
+        dates = np.arange(days + 1) + np.datetime64(today, "D")
+        used = np.busday_count(np.datetime64(today, "D"), dates,
+                               weekmask="1111110") * CYCLES_PER_DAY
+        due = np.searchsorted(used, remaining, side="left")
+        opens = np.searchsorted(used, remaining - THRESHOLD, side="left")
+        in_horizon = due <= days
+
+        df = df_cfg.loc[in_horizon, ["line", "sub_assembly", "kind"]].assign(
+            unit=df_cfg["fixture_no"].where(df_cfg["kind"] == "Fixture", df_cfg["station_no"])
+            .fillna("").astype(str)[in_horizon],
+            due=due[in_horizon],
+            opens=opens[in_horizon],
+        )
+        df_jobs = (
+            df.reset_index(names="row_id")
+            .groupby(DUE_GROUP_KEYS, sort=False)
+            .agg(due=("due", "min"), opens=("opens", "min"),
+                 due_points=("row_id", "size"), row_ids=("row_id", list))
+            .reset_index()
+        )
+
+        work_days = [d for d in range(days + 1) if np.is_busday(dates[d], weekmask="1111110")]
+        release, deadline = df_jobs["opens"].to_numpy(), df_jobs["due"].to_numpy()
+        job_lines = df_jobs["line"].tolist()
+        _, late_full = _edf(release, deadline, job_lines, work_days, full_cap)
+        lo, hi = 1, full_cap
+        while lo < hi:  # fewest audits per day that is no later than full capacity
+            mid = (lo + hi) // 2
+            if _edf(release, deadline, job_lines, work_days, mid)[1] <= late_full:
+                hi = mid
+            else:
+                lo = mid + 1
+        day_of, _ = _edf(release, deadline, job_lines, work_days, lo)
+
+        per_shift = max(1, auditors_per_shift * audits_per_auditor)
+        df_jobs["day_idx"] = day_of
+        df_jobs = df_jobs.sort_values(["day_idx", "line", "due"], kind="stable")
+        df_jobs["shift"] = df_jobs.groupby("day_idx").cumcount() // per_shift + 1
+        df_jobs.loc[df_jobs["day_idx"] < 0, "shift"] = 0
+        day_dates = pd.Series(dates.astype("datetime64[D]").astype(object))
+        df_jobs["day"] = df_jobs["day_idx"].map(lambda d: day_dates[d] if d >= 0 else None)
+        df_jobs["deadline"] = df_jobs["due"].map(day_dates)
+        df_jobs["late"] = (df_jobs["day_idx"] < 0) | (df_jobs["day_idx"] > df_jobs["due"])
+        df_jobs["slack_days"] = (df_jobs["due"] - df_jobs["day_idx"]).where(df_jobs["day_idx"] >= 0)
+        df_plan = df_jobs[["day", "shift", "line", "sub_assembly", "kind", "unit", "due_points",
+                           "deadline", "slack_days", "late", "row_ids"]].reset_index(drop=True)
+
+        _plan_cache[key] = (df_plan, lo)
+        return df_plan, lo
+
+
+# ---------- AUDIT HISTORY ----------
+@metrics.timed("fixture_audit_history_load_seconds")
+def load_history(since: str = None, until: str = None, audit_no=None) -> pd.DataFrame:
+    """The hot history file, plus archived months only when asked for.
+
+    `since`/`until` ("YYYY-MM" or "YYYY-MM-DD") pull in the archives of the
+    months they span, `audit_no` the archives that hold that audit. Rows are
+    not filtered here.
+    """
+    frames = [
+        pd.read_csv(path, encoding="utf-8-sig")
+        for path in archive_paths(since=since, until=until, audit_no=audit_no)
+    ]
+    if os.path.exists(HISTORY_PATH):
+        frames.append(pd.read_csv(HISTORY_PATH, encoding="utf-8-sig"))
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+def _history_stats() -> dict:
+    """Max audit number and audits per day, recomputed only when the file changes.
+
+    Only the hot file is read; archived audits count through the summary.
+    """
+    with _lock:
+        _sync_caches()
+        sig = (file_signature(HISTORY_PATH), file_signature(ARCHIVE_SUMMARY_PATH))
+        if _history_cache["stats"] is not None and sig == _history_cache["sig"]:
+            return _history_cache["stats"]
+
+        stats = {"max_audit_no": read_archive_summary()["max_audit_no"], "per_day": {}}
+        df_hist = load_history()
+        if not df_hist.empty:
+            if "audit_no" in df_hist.columns:
+                nums = pd.to_numeric(df_hist["audit_no"], errors="coerce").dropna()
+                if not nums.empty:
+                    stats["max_audit_no"] = max(stats["max_audit_no"], int(nums.max()))
+            if "timestamp" in df_hist.columns:
+                days = df_hist["timestamp"].astype(str).str[:10]
+                stats["per_day"] = days.value_counts().to_dict()
+
+        _history_cache["sig"] = sig
+        _history_cache["stats"] = stats
+        return stats
+
+
+def get_completed_today_count() -> int:
+    """Count audits completed today from history"""
+    today_str = dt.date.today().strftime("%Y-%m-%d")
+    return int(_history_stats()["per_day"].get(today_str, 0))
+
+
+def get_next_audit_no() -> int:
+    """The number the next audit will most likely get, for display.
+
+    Another session or process may save first; append_audit_history()
+    assigns the final number.
+    """
+    return max(_history_stats()["max_audit_no"], _read_int(AUDIT_NO_PATH)) + 1
+
+
+def _allocate_audit_no() -> int:
+    """Reserve the next audit number; caller holds write_lock().
+
+    Numbers of audits without "No" rows never reach the history, so the
+    last number handed out is kept in AUDIT_NO_PATH as well.
+    """
+    audit_no = get_next_audit_no()
+    _write_int(AUDIT_NO_PATH, audit_no)
+    return audit_no
+
+
+@metrics.timed("fixture_audit_save_seconds", target="audit_history")
+def append_audit_history(records: list, checked: pd.DataFrame = None) -> int:
+    """Append the "No" rows of a saved audit and fold the audit into the rollup.
+
+    `checked` are the master rows that were on the checklist, so check
+    points that passed count as audited too. The audit number is assigned
+    here, under the write lock, replacing the "audit_no" of `records`;
+    returns it (None when there is nothing to save).
+    """
+    import change_feed  # imports this module
+    import reliability  # imports this module
+
+    if not records and checked is None:
+        return None
+    with write_lock():
+        audit_no = _allocate_audit_no()
+        records = [dict(rec, audit_no=audit_no) for rec in records]
+        # before the append: a first rollup is rebuilt from the history so far
+        reliability.update_rollup(records, checked)
+        if not records:
+            return audit_no
+        change_feed.emit([{"entity": "history", "op": "insert", "row_id": None,
+                           "source": "audit", "data": rec} for rec in records])
+        new_df = pd.DataFrame(records)
+        size = os.path.getsize(HISTORY_PATH) if os.path.exists(HISTORY_PATH) else 0
+        if size:
+            new_df.to_csv(HISTORY_PATH, mode="a", header=False, index=False)
+        else:
+            new_df.to_csv(HISTORY_PATH, mode="w", header=True, index=False)
+        metrics.inc("fixture_audit_bytes_written_total",
+                    os.path.getsize(HISTORY_PATH) - size, target="audit_history")
+
+    # the first save of a new month moves the oldest hot month out
+    per_day = _history_stats()["per_day"]
+    if per_day and min(per_day)[:7] < _first_hot_month(dt.date.today()):
+        rotate_history()
+    return audit_no
+
+
+# ---------- HISTORY ARCHIVE ----------
+def _month_offset(day: dt.date, months: int) -> str:
+    """"YYYY-MM" of the month `months` before the month of `day`."""
+    n = day.year * 12 + day.month - 1 - months
+    return f"{n // 12:04d}-{n % 12 + 1:02d}"
+
+
+def _first_hot_month(today: dt.date) -> str:
+    return _month_offset(today, max(HOT_MONTHS, 1) - 1)
+
+
+def read_archive_summary() -> dict:
+    """Per archived month: file, row count and audit number range.
+
+    "history_generation" counts the rewrites of the hot file, so readers
+    that tail it (the search index) know to start over.
+    """
+    with _lock:
+        sig = file_signature(ARCHIVE_SUMMARY_PATH)
+        if sig != _summary_cache["sig"] or _summary_cache["summary"] is None:
+            if sig is None:
+                _summary_cache["summary"] = {"max_audit_no": 0, "months": {}}
+            else:
+                with open(ARCHIVE_SUMMARY_PATH) as f:
+                    _summary_cache["summary"] = json.load(f)
+            _summary_cache["sig"] = sig
+        return _summary_cache["summary"]
+
+
+def archive_paths(since: str = None, until: str = None, audit_no=None) -> list:
+    """Archive files a query reaching back to `since` (or for `audit_no`) must read."""
+    if since is None and until is None and audit_no is None:
+        return []
+    paths = []
+    for month, entry in sorted(read_archive_summary()["months"].items()):
+        if since is not None and month < since[:7]:
+            continue
+        if until is not None and month > until[:7]:
+            continue
+        if audit_no is not None and not (
+            entry["min_audit_no"] <= int(audit_no) <= entry["max_audit_no"]
+        ):
+            continue
+        paths.append(os.path.join(ARCHIVE_DIR, entry["file"]))
+    return paths
+
+
+def rotate_history(today: dt.date = None) -> dict:
+    """Move months before the hot window into gzip archives and apply retention.
+
+    Returns the months archived and the archived months deleted.
+    """
+    import change_feed  # imports this module
+
+    today = today or dt.date.today()
+    first_hot = _first_hot_month(today)
+    oldest_kept = _month_offset(today, RETENTION_MONTHS)
+    result = {"archived": [], "deleted": []}
+    with write_lock():
+        if not os.path.exists(HISTORY_PATH):
+            return result
+        df_hist = pd.read_csv(HISTORY_PATH, encoding="utf-8-sig", dtype=str)
+        months = df_hist["timestamp"].astype(str).str[:7]
+        cold = months < first_hot
+
+        summary = json.loads(json.dumps(read_archive_summary()))  # private copy
+        events = []
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        for month, df_month in df_hist[cold].groupby(months[cold], sort=True):
+            file_name = f"audit_history_{month}.csv.gz"
+            path = os.path.join(ARCHIVE_DIR, file_name)
+            if os.path.exists(path):  # late rows for an archived month
+                df_month = pd.concat([pd.read_csv(path, dtype=str), df_month])
+            nums = pd.to_numeric(df_month["audit_no"], errors="coerce").dropna()
+            _write_atomic(
+                lambda p: df_month.to_csv(p, index=False, compression="gzip"), path,
+                "history_archive",
+            )
+            summary["months"][month] = {
+                "file": file_name,
+                "rows": len(df_month),
+                "min_audit_no": int(nums.min()) if not nums.empty else 0,
+                "max_audit_no": int(nums.max()) if not nums.empty else 0,
+            }
+            summary["max_audit_no"] = max(
+                summary["max_audit_no"], summary["months"][month]["max_audit_no"]
+            )
+            result["archived"].append(month)
+            events.append({"entity": "history", "op": "archive", "row_id": None,
+                           "source": "rotate", "data": {"month": month, "file": file_name}})
+
+        # past retention the rows go, but the audit numbers stay reserved
+        for month in sorted(summary["months"]):
+            if month < oldest_kept:
+                entry = summary["months"].pop(month)
+                path = os.path.join(ARCHIVE_DIR, entry["file"])
+                if os.path.exists(path):
+                    os.remove(path)
+                result["deleted"].append(month)
+                events.append({"entity": "history", "op": "purge", "row_id": None,
+                               "source": "rotate", "data": {"month": month}})
+
+        if result["archived"]:
+            summary["history_generation"] = summary.get("history_generation", 0) + 1
+
+        def write_summary(p):
+            with open(p, "w") as f:
+                json.dump(summary, f, indent=2)
+        _write_atomic(write_summary, ARCHIVE_SUMMARY_PATH)
+        if result["archived"]:
+            _write_atomic(
+                lambda p: df_hist[~cold].to_csv(p, index=False, encoding="utf-8-sig"),
+                HISTORY_PATH,
+                "audit_history",
+            )
+        change_feed.emit(events)
+    return result
+
+
+# ---------- WARM-UP ----------
+def warmup(today: dt.date = None) -> dict:
+    """Build the shared caches a first page view needs; returns seconds per step.
+
+    Run once when a server process starts, so the first tablet to connect
+    does not pay for parsing the master and computing the due set. Also
+    writes the day's due snapshot if no process has yet.
+    """
+    import due_snapshots  # imports this module
+
+    today = today or dt.date.today()
+    steps = [
+        ("master", load_master),
+        ("hierarchy", lambda: [hierarchy(line) for line in list_lines()]),
+        ("cycles", lambda: current_cycles_table(today)),
+        ("due items", lambda: get_due_items(today)),
+        ("history", _history_stats),
+        ("due snapshot", lambda: due_snapshots.ensure_due_snapshot(today)),
+    ]
+    timings = {}
+    for name, step in steps:
+        t0 = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - t0
+    return timings
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fixture audit data maintenance")
+    parser.add_argument("command", choices=["shard", "rotate-history", "warmup"],
+                        help="shard: split config_master.csv into per-line shards; "
+                             "rotate-history: archive old months and apply retention; "
+                             "warmup: time building the shared caches")
+    args = parser.parse_args()
+
+    if args.command == "shard":
+        result = shard_master()
+        for line, entry in result["shards"].items():
+            print(f"{line}: {entry['rows']} rows -> {os.path.join(SHARD_DIR, entry['file'])}")
+
+    if args.command == "rotate-history":
+        result = rotate_history()
+        print(f"archived: {', '.join(result['archived']) or 'nothing'}")
+        print(f"deleted past retention: {', '.join(result['deleted']) or 'nothing'}")
+
+    if args.command == "warmup":
+        for name, seconds in warmup().items():
+            print(f"{name}: {seconds * 1000:.0f} ms")
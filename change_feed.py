@@ -0,0 +1,155 @@
+"""Append-only change feed of master and history mutations.
+
+Every write under audit_engine.write_lock() that changes data appends one
+JSON line per changed row to DATA_DIR/change_feed.jsonl:
+
+    {"seq": 42, "ts": "2026-10-19T09:12:03", "entity": "master", "op": "update",
+     "row_id": 7, "source": "audit", "data": {"Changed before date": "2026-10-19"}}
+
+entity  "master" (op update/insert) or "history" (op insert, or archive
+        when a month moves to history_archive)
+seq     strictly increasing, with no gaps
+
+Mirrors tail the feed with read_changes(after=<last seq seen>) and keep
+their position with commit_offset(), one small file per consumer under
+DATA_DIR/change_feed_offsets. Readers keep a sparse seq -> byte offset
+index and extend it from the appended tail only, like the image manifest.
+"""
+import bisect
+import datetime as dt
+import json
+import os
+import re
+import threading
+
+import numpy as np
+
+import audit_engine as engine
+
+FEED_PATH = os.path.join(engine.DATA_DIR, "change_feed.jsonl")
+OFFSETS_DIR = os.path.join(engine.DATA_DIR, "change_feed_offsets")
+INDEX_EVERY = 256  # seqs between index entries
+
+_lock = threading.Lock()
+_index = {"size": 0, "last_seq": 0, "seqs": [], "offsets": []}
+
+
+def _jsonable(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (dt.date, dt.datetime)):
+        return value.isoformat()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+# ---------- WRITING ----------
+def emit(events: list):
+    """Append events ({"entity", "op", "row_id", "data", ...}); caller holds write_lock().
+
+    Returns the last sequence number written.
+    """
+    if not events:
+        return last_seq()
+    seq = last_seq()
+    ts = dt.datetime.now().isoformat(timespec="seconds")
+    lines = []
+    for event in events:
+        seq += 1
+        rec = {"seq": seq, "ts": ts}
+        rec.update({k: _jsonable(v) for k, v in event.items() if k != "data"})
+        rec["data"] = {str(k): _jsonable(v) for k, v in (event.get("data") or {}).items()}
+        lines.append(json.dumps(rec, separators=(",", ":")) + "\n")
+    with open(FEED_PATH, "a") as f:
+        f.write("".join(lines))
+    return seq
+
+
+def row_events(entity: str, op: str, df, source: str = "", columns: list = None) -> list:
+    """One event per row of `df` (index = row id), limited to `columns` if given."""
+    cols = columns or list(df.columns)
+    return [
+        {"entity": entity, "op": op, "row_id": row_id, "source": source,
+         "data": {c: rec[c] for c in cols}}
+        for row_id, rec in zip(df.index, df.to_dict("records"))
+    ]
+
+
+# ---------- READING ----------
+def _refresh_index():
+    """Index the lines appended since the last call; caller holds _lock."""
+    size = os.path.getsize(FEED_PATH) if os.path.exists(FEED_PATH) else 0
+    if size < _index["size"]:  # feed replaced; start over
+        _index.update(size=0, last_seq=0, seqs=[], offsets=[])
+    if size == _index["size"]:
+        return
+    with open(FEED_PATH, "rb") as f:
+        f.seek(_index["size"])
+        data = f.read(size - _index["size"])
+    data = data[: data.rfind(b"\n") + 1]  # skip a line still being written
+    pos = _index["size"]
+    for line in data.splitlines(keepends=True):
+        seq = int(re.match(rb'\{"seq":(\d+)', line).group(1))
+        if not _index["seqs"] or seq - _index["seqs"][-1] >= INDEX_EVERY:
+            _index["seqs"].append(seq)
+            _index["offsets"].append(pos)
+        _index["last_seq"] = seq
+        pos += len(line)
+    _index["size"] = pos
+
+
+def last_seq() -> int:
+    with _lock:
+        _refresh_index()
+        return _index["last_seq"]
+
+
+def read_changes(after: int = 0, limit: int = 1000) -> list:
+    """Up to `limit` changes with seq > `after`, oldest first."""
+    with _lock:
+        _refresh_index()
+        i = bisect.bisect_right(_index["seqs"], after + 1) - 1
+        start = _index["offsets"][i] if i >= 0 else 0
+        end = _index["size"]
+    changes = []
+    if not end:
+        return changes
+    with open(FEED_PATH, "rb") as f:
+        f.seek(start)
+        while f.tell() < end and len(changes) < limit:
+            rec = json.loads(f.readline())
+            if rec["seq"] > after:
+                changes.append(rec)
+    return changes
+
+
+# ---------- CONSUMER OFFSETS ----------
+def _offset_path(consumer: str) -> str:
+    if not re.fullmatch(r"[A-Za-z0-9_.-]{1,64}", consumer or ""):
+        raise ValueError("consumer must be 1-64 letters, digits, '_', '.' or '-'")
+    return os.path.join(OFFSETS_DIR, f"{consumer}.json")
+
+
+def get_offset(consumer: str) -> int:
+    """Last seq `consumer` committed, 0 before its first commit."""
+    path = _offset_path(consumer)
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        return int(json.load(f)["seq"])
+
+
+def commit_offset(consumer: str, seq: int) -> int:
+    """Record that `consumer` processed everything up to `seq`."""
+    path = _offset_path(consumer)
+    seq = int(seq)
+    if not 0 <= seq <= last_seq():
+        raise ValueError(f"seq must be between 0 and {last_seq()}")
+    os.makedirs(OFFSETS_DIR, exist_ok=True)
+
+    def write(p):
+        with open(p, "w") as f:
+            json.dump({"seq": seq, "ts": dt.datetime.now().isoformat(timespec="seconds")}, f)
+    engine._write_atomic(write, path)
+    return seq
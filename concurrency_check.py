@@ -0,0 +1,169 @@
+"""Multi-process consistency check of the shared data directory.
+
+Several processes (one per simulated server replica) save audits against
+one synthetic data directory at the same time, the way Streamlit replicas
+and api_server.py processes do. Every save updates one master row's change
+date and appends one "No" history row, so afterwards the check can see
+exactly what should be there:
+
+    lost rows       every saved history row is in audit_history.csv
+    audit numbers   every save got its own number, the one it was told
+    lost updates    every master row carries the date its save wrote
+    change feed     sequence numbers are gapless and cover every write
+    rollup          every save was counted once
+
+    python concurrency_check.py --processes 4 --saves 8
+    python concurrency_check.py --shard
+
+Exits 1 if any check fails.
+"""
+import argparse
+import datetime as dt
+import multiprocessing
+import os
+import queue
+import shutil
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# ---------- ONE REPLICA ----------
+def replica(worker: int, saves: int, row_ids: list, results):
+    """Save `saves` audits, one master row each; report (remark, audit no)."""
+    sys.path.insert(0, REPO_DIR)
+    import audit_engine as engine
+
+    for i, row_id in enumerate(row_ids):
+        row = engine.load_master().loc[row_id]
+        changed = dt.date.today() - dt.timedelta(days=worker * saves + i + 1)
+        engine.save_master_dates({row_id: changed})
+        remark = f"replica {worker} save {i}"
+        record = {
+            "timestamp": dt.datetime.now().isoformat(timespec="seconds"),
+            "audit_no": engine.get_next_audit_no(),  # provisional, replaced on append
+            "employee_id": f"R{worker}",
+            "line": row["line"],
+            "sub_assembly": row["sub_assembly"],
+            "kind": row["kind"],
+            "fixture_no": row["fixture_no"] if row["kind"] == "Fixture" else "",
+            "station_no": row["station_no"] if row["kind"] != "Fixture" else "",
+            "fixture_part_desc": row["fixture_part_desc"],
+            "check_point": row["check_point"],
+            "qty": int(row["qty"]),
+            "status": "No",
+            "changed_before_date": changed.strftime("%d-%m-%Y"),
+            "remarks": remark,
+            "image_info": "",
+        }
+        audit_no = engine.append_audit_history([record],
+                                               checked=engine.load_master().loc[[row_id]])
+        results.put((remark, row_id, changed.isoformat(), audit_no))
+
+
+# ---------- CHECKS ----------
+def check(expected: list) -> list:
+    """Failures found in the data directory after all replicas are done."""
+    import audit_engine as engine
+    import change_feed
+    import reliability
+
+    failures = []
+    total = len(expected)
+    df_hist = engine.load_history()
+    got = dict(zip(df_hist["remarks"], df_hist["audit_no"].astype(int)))
+    lost = [remark for remark, _, _, _ in expected if remark not in got]
+    if lost or len(df_hist) != total:
+        failures.append(f"lost rows: {len(df_hist)} history rows for {total} saves "
+                        f"({len(lost)} missing)")
+
+    dupes = int(df_hist["audit_no"].duplicated().sum())
+    if dupes:
+        failures.append(f"audit numbers: {dupes} duplicates")
+    wrong = [r for r, _, _, n in expected if r in got and got[r] != n]
+    if wrong:
+        failures.append(f"audit numbers: {len(wrong)} rows differ from the number returned")
+
+    df_cfg = engine.load_master()
+    stale = [row_id for _, row_id, day, _ in expected
+             if str(df_cfg.at[row_id, engine.DATE_COL]) != day]
+    if stale:
+        failures.append(f"lost updates: {len(stale)} master rows lost their saved date")
+
+    changes = change_feed.read_changes(0, limit=10 * total + 100)
+    seqs = [c["seq"] for c in changes]
+    if seqs != list(range(1, len(seqs) + 1)):
+        failures.append("change feed: sequence numbers are not gapless")
+    updates = sum(c["entity"] == "master" and c["op"] == "update" for c in changes)
+    inserts = sum(c["entity"] == "history" and c["op"] == "insert" for c in changes)
+    if updates != total or inserts != total:
+        failures.append(f"change feed: {updates} master updates and {inserts} history "
+                        f"inserts for {total} saves")
+
+    df_roll = reliability.load_rollup()
+    audits, fails = int(df_roll["audits"].sum()), int(df_roll["failures"].sum())
+    if audits != total or fails != total:
+        failures.append(f"rollup: {audits} audits and {fails} failures for {total} saves")
+    return failures
+
+
+# ---------- MAIN ----------
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Multi-process data directory check")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--saves", type=int, default=8, help="audits saved per process")
+    parser.add_argument("--shard", action="store_true", help="run against a sharded master")
+    parser.add_argument("--keep", action="store_true", help="keep the synthetic data directory")
+    args = parser.parse_args()
+
+    # the data layer reads its location at import time, so set it first;
+    # the spawned replicas inherit it
+    data_dir = tempfile.mkdtemp(prefix="fixture_audit_procs_")
+    os.environ["FIXTURE_AUDIT_DATA_DIR"] = data_dir
+    sys.path.insert(0, REPO_DIR)
+    from load_test import make_data_dir
+
+    make_data_dir(data_dir, 4, 12, 8)
+    os.chdir(data_dir)
+    if args.shard:
+        import audit_engine as engine
+
+        engine.shard_master()
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=replica, args=(w, args.saves, list(range(w * args.saves,
+                                                                  (w + 1) * args.saves)),
+                                          results))
+        for w in range(args.processes)
+    ]
+    for p in procs:
+        p.start()
+    expected = []
+    try:
+        while len(expected) < args.processes * args.saves:
+            expected.append(results.get(timeout=300))
+    except queue.Empty:
+        pass  # a replica died; its saves show up as missing below
+    for p in procs:
+        p.join()
+
+    failures = check(expected)
+    if any(p.exitcode for p in procs) or len(expected) < args.processes * args.saves:
+        failures.append("a replica process failed")
+    mode = "sharded" if args.shard else "single-file"
+    print(f"{args.processes} processes x {args.saves} saves, {mode} master in {data_dir}")
+    for failure in failures:
+        print(f"  FAIL {failure}")
+    print("all checks passed" if not failures else f"{len(failures)} check(s) failed")
+
+    os.chdir(REPO_DIR)
+    if not args.keep:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
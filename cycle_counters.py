@@ -0,0 +1,180 @@
+"""Machine cycle counter ingestion.
+
+Stations drop CSV files of counter readings into DATA_DIR/counter_drop:
+
+    timestamp,line,unit,counter
+    2026-10-19T06:00:00,J-Line,SA 02,184220
+
+`unit` is the fixture_no or station_no of the master rows it drives and
+`counter` is the machine's cumulative cycle count. Each ingest turns new
+readings into per-unit daily cycle totals (handling counter resets) and
+moves the file to counter_drop/processed. get_due_items then uses the
+real cycles since "Changed before date" for every metered unit instead of
+the working-day estimate.
+
+    python cycle_counters.py ingest
+    python cycle_counters.py watch --interval 60
+"""
+import argparse
+import bisect
+import datetime as dt
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+import audit_engine as engine
+
+DROP_DIR = os.path.join(engine.DATA_DIR, "counter_drop")
+PROCESSED_DIR = os.path.join(DROP_DIR, "processed")
+COUNTS_DIR = os.path.join(engine.DATA_DIR, "cycle_counts")
+DAILY_PATH = os.path.join(COUNTS_DIR, "daily_cycles.csv")
+LAST_READINGS_PATH = os.path.join(COUNTS_DIR, "last_readings.json")
+READING_COLUMNS = ["timestamp", "line", "unit", "counter"]
+
+_lock = threading.Lock()
+_totals_cache = {"sig": None, "units": {}}  # (line, unit) -> (days, cumulative cycles)
+
+
+def counts_signature():
+    return engine.file_signature(DAILY_PATH)
+
+
+def unit_of(row) -> str:
+    """Counter unit of a master row: its fixture, else its station."""
+    fixture_no = row.get("fixture_no")
+    if isinstance(fixture_no, str) and fixture_no.strip():
+        return fixture_no.strip()
+    station_no = row.get("station_no")
+    return station_no.strip() if isinstance(station_no, str) else ""
+
+
+# ---------- INGESTION ----------
+def _read_last_readings() -> dict:
+    if not os.path.exists(LAST_READINGS_PATH):
+        return {}
+    with open(LAST_READINGS_PATH) as f:
+        return json.load(f)
+
+
+def _daily_deltas(df_read: pd.DataFrame, last: dict) -> dict:
+    """Fold readings into {(line, unit, day): cycles}; updates `last` in place."""
+    deltas = {}
+    df_read = df_read.sort_values("timestamp", kind="stable")
+    for rec in df_read.itertuples(index=False):
+        key = f"{rec.line}|{rec.unit}"
+        prev = last.get(key)
+        if prev is not None and rec.timestamp <= prev[0]:
+            continue  # already ingested or out of order
+        counter = int(rec.counter)
+        # the first reading of a unit only marks where metering starts
+        delta = 0
+        if prev is not None:
+            # a counter lower than the last reading means the machine was reset
+            delta = counter - prev[1] if counter >= prev[1] else counter
+        day_key = (rec.line, rec.unit, rec.timestamp[:10])
+        deltas[day_key] = deltas.get(day_key, 0) + delta
+        last[key] = [rec.timestamp, counter]
+    return deltas
+
+
+def ingest_drop_folder() -> int:
+    """Ingest every pending drop file; returns the number of readings read."""
+    if not os.path.isdir(DROP_DIR):
+        return 0
+    with engine.write_lock():  # also tells other replicas to reload
+        names = sorted(n for n in os.listdir(DROP_DIR) if n.lower().endswith(".csv"))
+        if not names:
+            return 0
+        frames = []
+        for name in names:
+            df = pd.read_csv(os.path.join(DROP_DIR, name), dtype=str, encoding="utf-8-sig")
+            frames.append(df[READING_COLUMNS].dropna())
+        df_read = pd.concat(frames, ignore_index=True)
+        df_read["counter"] = pd.to_numeric(df_read["counter"], errors="coerce")
+        df_read = df_read.dropna(subset=["counter"])
+
+        last = _read_last_readings()
+        deltas = _daily_deltas(df_read, last)
+
+        os.makedirs(COUNTS_DIR, exist_ok=True)
+        if deltas:
+            df_out = pd.DataFrame(
+                [(line, unit, day, cycles) for (line, unit, day), cycles in deltas.items()],
+                columns=["line", "unit", "day", "cycles"],
+            )
+            df_out.to_csv(DAILY_PATH, mode="a", header=not os.path.exists(DAILY_PATH),
+                          index=False)
+
+        def write(p):
+            with open(p, "w") as f:
+                json.dump(last, f)
+        engine._write_atomic(write, LAST_READINGS_PATH)
+
+        os.makedirs(PROCESSED_DIR, exist_ok=True)
+        for name in names:
+            os.replace(os.path.join(DROP_DIR, name), os.path.join(PROCESSED_DIR, name))
+        return len(df_read)
+
+
+# ---------- QUERIES ----------
+def _unit_totals() -> dict:
+    """Per-unit sorted days and running cycle totals, reloaded when the file changes."""
+    with _lock:
+        sig = counts_signature()
+        if sig == _totals_cache["sig"]:
+            return _totals_cache["units"]
+        units = {}
+        if sig is not None:
+            df = pd.read_csv(DAILY_PATH, dtype={"line": str, "unit": str, "day": str})
+            df = df.groupby(["line", "unit", "day"], sort=True)["cycles"].sum().reset_index()
+            for (line, unit), grp in df.groupby(["line", "unit"], sort=False):
+                days = [dt.date.fromisoformat(d) for d in grp["day"]]
+                units[(line, unit)] = (days, grp["cycles"].cumsum().tolist())
+        _totals_cache["sig"] = sig
+        _totals_cache["units"] = units
+        return units
+
+
+def current_cycles(df_cfg: pd.DataFrame, today: dt.date) -> tuple:
+    """Cycles since "Changed before date" for each row, and where they came from.
+
+    Metered units count their recorded cycles from the change date through
+    today; days before a unit's first reading, and units without a counter,
+    fall back to the working-day estimate.
+    """
+    units = _unit_totals()
+    cycles = engine.working_cycles_series(df_cfg[engine.DATE_COL], today).tolist()
+    sources = ["estimate"] * len(cycles)
+    if not units:
+        return cycles, sources
+    for pos, rec in enumerate(df_cfg.to_dict("records")):
+        changed = rec.get(engine.DATE_COL)
+        totals = units.get((rec["line"], unit_of(rec)))
+        if totals is None or not isinstance(changed, dt.date):
+            continue
+        days, cum = totals
+        start = max(changed, days[0])
+        i = bisect.bisect_left(days, start)
+        j = bisect.bisect_right(days, today)
+        counted = (cum[j - 1] if j else 0) - (cum[i - 1] if i else 0)
+        cycles[pos] = engine.working_cycles_from_date(changed, days[0]) + counted
+        sources[pos] = "counter"
+    return cycles, sources
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest machine cycle counter readings")
+    parser.add_argument("command", choices=["ingest", "watch"])
+    parser.add_argument("--interval", type=int, default=60, help="watch: seconds between scans")
+    args = parser.parse_args()
+
+    while True:
+        n = ingest_drop_folder()
+        if n or args.command == "ingest":
+            print(f"ingested {n} readings")
+        if args.command == "ingest":
+            break
+        time.sleep(args.interval)
@@ -0,0 +1,99 @@
+import datetime as dt
+import os
+import threading
+
+import pandas as pd
+
+from audit_engine import DATA_DIR, get_due_items
+
+
+# ---------- DAILY DUE SNAPSHOTS ----------
+# One small parquet file per calendar day holding the due set as it stood
+# that day: row key, line and remaining cycles. Files are immutable once
+# written, so the trend view only ever reads each of them once per process.
+#
+# The first process to run on a day writes it: server warm-up, any app
+# rerun or an API request. A day on which nothing runs leaves a gap in the
+# trend; schedule `python due_snapshots.py` daily where that matters.
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "snapshots")
+
+_trend_cache = {}  # file name -> pending count per line
+
+
+def snapshot_path(day: dt.date) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"due_{day.isoformat()}.parquet")
+
+
+def has_due_snapshot(day: dt.date) -> bool:
+    return os.path.exists(snapshot_path(day))
+
+
+def write_due_snapshot(df_due: pd.DataFrame, day: dt.date) -> bool:
+    """Persist the due set for `day` once. Returns True if a file was written."""
+    if has_due_snapshot(day):
+        return False
+    path = snapshot_path(day)
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    snap = pd.DataFrame(
+        {
+            "row_id": df_due["row_id"].astype("int32"),
+            "line": df_due["line"].astype(str).astype("category"),
+            "remaining_cycles": (
+                df_due["frequency_cycles"] - df_due["current_frequency"]
+            ).astype("int32"),
+        }
+    )
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"  # sessions may race for the day
+    snap.to_parquet(tmp_path, index=False, compression="zstd")
+    os.replace(tmp_path, path)
+    return True
+
+
+def ensure_due_snapshot(day: dt.date = None) -> bool:
+    """Write the plant-wide due set for `day` unless it exists; one stat otherwise."""
+    day = day or dt.date.today()
+    if has_due_snapshot(day):
+        return False
+    return write_due_snapshot(get_due_items(day), day)
+
+
+def load_due_snapshot(day: dt.date) -> pd.DataFrame:
+    path = snapshot_path(day)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=["row_id", "line", "remaining_cycles"])
+    return pd.read_parquet(path)
+
+
+def load_due_trend(days: int = 90) -> pd.DataFrame:
+    """Pending audits per day and line, read from the stored snapshots only."""
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return pd.DataFrame()
+
+    names = sorted(
+        n for n in os.listdir(SNAPSHOT_DIR)
+        if n.startswith("due_") and n.endswith(".parquet")
+    )[-days:]
+
+    counts = {}
+    for name in names:
+        if name not in _trend_cache:
+            snap = pd.read_parquet(os.path.join(SNAPSHOT_DIR, name), columns=["line"])
+            _trend_cache[name] = snap["line"].astype(str).value_counts().to_dict()
+        day = dt.date.fromisoformat(name[len("due_"):-len(".parquet")])
+        counts[day] = _trend_cache[name]
+
+    if not counts:
+        return pd.DataFrame()
+
+    trend = pd.DataFrame(list(counts.values()), index=list(counts.keys()))
+    if trend.columns.empty:
+        trend["Pending"] = 0
+    trend = trend.fillna(0).astype(int)
+    trend.index.name = "date"
+    return trend.sort_index()
+
+
+if __name__ == "__main__":
+    written = ensure_due_snapshot()
+    print(f"{snapshot_path(dt.date.today())}: {'written' if written else 'already present'}")
@@ -0,0 +1,180 @@
+import csv
+import hashlib
+import io
+import os
+import posixpath
+import threading
+
+from PIL import Image
+
+import metrics
+
+
+# ---------- IMAGE MANIFEST ----------
+# Every audit image is recorded once in images/manifest.csv with its
+# normalized path, size, hash and thumbnail. The manifest is loaded once
+# per process and then only its appended tail is read, so pages answer
+# "has image?" from memory instead of stat-ing the filesystem per row.
+# Paths are stored relative to the data directory holding images/, so
+# history rows stay valid wherever that directory is mounted.
+MANIFEST_NAME = "manifest.csv"
+THUMBS_SUBDIR = "thumbs"
+THUMB_SIZE = (160, 120)
+FIELDS = ["path", "size", "sha256", "thumb"]
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+
+
+def normalize_image_path(img_path) -> str:
+    """Stored image paths use "/" separators, whatever OS wrote them."""
+    if not isinstance(img_path, str) or not img_path.strip():
+        return ""
+    return posixpath.normpath(img_path.strip().replace("\\", "/"))
+
+
+def make_thumbnail(src: str, dst: str):
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    with Image.open(src) as im:
+        im = im.convert("RGB")
+        im.thumbnail(THUMB_SIZE)
+        im.save(dst, "JPEG", quality=80)
+
+
+class ImageManifest:
+    def __init__(self, images_dir: str):
+        self.images_dir = images_dir
+        self.root = os.path.dirname(os.path.abspath(images_dir))
+        self.prefix = normalize_image_path(os.path.basename(os.path.abspath(images_dir)))
+        self.path = os.path.join(images_dir, MANIFEST_NAME)
+        self.entries = {}  # normalized relative path -> manifest row
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def key(self, img_path) -> str:
+        """Manifest key of `img_path`: normalized and relative to the data directory."""
+        key = normalize_image_path(img_path)
+        if key.startswith("/"):
+            key = normalize_image_path(os.path.relpath(key, self.root))
+        return key
+
+    def resolve(self, img_path) -> str:
+        """Filesystem path of a stored image or thumbnail."""
+        return os.path.join(self.root, self.key(img_path))
+
+    def _thumb_for(self, img_path: str) -> str:
+        name = posixpath.splitext(posixpath.basename(img_path))[0] + ".jpg"
+        return posixpath.join(self.prefix, THUMBS_SUBDIR, name)
+
+    def _append(self, entry: dict):
+        new_file = not os.path.exists(self.path)
+        with open(self.path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            if new_file:
+                writer.writeheader()
+            writer.writerow(entry)
+        self.entries[entry["path"]] = entry
+
+    def _record(self, img_path: str, data: bytes) -> dict:
+        thumb = self._thumb_for(img_path)
+        make_thumbnail(self.resolve(img_path), self.resolve(thumb))
+        entry = {
+            "path": img_path,
+            "size": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "thumb": thumb,
+        }
+        self._append(entry)
+        return entry
+
+    def _bootstrap(self):
+        """First run on an existing images folder: record what is already there."""
+        os.makedirs(self.images_dir, exist_ok=True)
+        for name in sorted(os.listdir(self.images_dir)):
+            if not name.lower().endswith(IMAGE_EXTS):
+                continue
+            img_path = posixpath.join(self.prefix, name)
+            with open(self.resolve(img_path), "rb") as f:
+                self._record(img_path, f.read())
+        if not os.path.exists(self.path):
+            with open(self.path, "w", newline="") as f:
+                csv.DictWriter(f, fieldnames=FIELDS).writeheader()
+        self._offset = os.path.getsize(self.path)
+
+    def refresh(self):
+        """Load the manifest once, afterwards only rows appended by other writers."""
+        with self._lock:
+            if not os.path.exists(self.path):
+                self.entries = {}
+                self._bootstrap()
+                return
+            size = os.path.getsize(self.path)
+            if size < self._offset:
+                self.entries, self._offset = {}, 0
+            if size == self._offset:
+                return
+            with open(self.path, "rb") as f:
+                if self._offset == 0:
+                    f.readline()  # header
+                    self._offset = f.tell()
+                f.seek(self._offset)
+                data = f.read()
+            data = data[: data.rfind(b"\n") + 1]  # skip a row still being written
+            for row in csv.DictReader(io.StringIO(data.decode()), fieldnames=FIELDS):
+                self.entries[row["path"]] = row
+            self._offset += len(data)
+
+    # ----- writing -----
+    def save_image(self, data: bytes, base_name: str) -> str:
+        """Write an audit image and record it; returns its manifest key.
+
+        History rows point at these paths, so a recorded image is never
+        replaced: raises ValueError if `base_name` already holds other bytes.
+        """
+        img_path = posixpath.join(self.prefix, base_name)
+        entry = self.entries.get(img_path)
+        if entry is not None:
+            if entry["sha256"] == hashlib.sha256(data).hexdigest():
+                return img_path  # widget re-sent the same capture on a rerun
+            raise ValueError(f"{img_path} already holds a different image")
+
+        os.makedirs(self.images_dir, exist_ok=True)
+        try:
+            f = open(self.resolve(img_path), "xb")
+        except FileExistsError:
+            raise ValueError(f"{img_path} already exists") from None
+        with f:
+            f.write(data)
+        metrics.inc("fixture_audit_bytes_written_total", len(data), target="images")
+        with self._lock:
+            self._record(img_path, data)
+        return img_path
+
+    # ----- lookups -----
+    def lookup(self, img_path):
+        return self.entries.get(self.key(img_path))
+
+    def has_image(self, img_path) -> bool:
+        return self.lookup(img_path) is not None
+
+    def thumbnail(self, img_path) -> str:
+        entry = self.lookup(img_path)
+        if entry is None:
+            return ""
+        thumb = self.resolve(entry["thumb"])
+        if not os.path.exists(thumb):
+            make_thumbnail(self.resolve(entry["path"]), thumb)
+        return thumb
+
+
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+
+def get_image_manifest(images_dir: str) -> ImageManifest:
+    """Process-wide manifest for `images_dir`, refreshed with one stat per call."""
+    key = os.path.abspath(images_dir)
+    with _manifests_lock:
+        if key not in _manifests:
+            _manifests[key] = ImageManifest(images_dir)
+        manifest = _manifests[key]
+    manifest.refresh()
+    return manifest
@@ -0,0 +1,266 @@
+"""Concurrent-user load test for the Streamlit apps.
+
+Each simulated auditor is a headless app session (streamlit.testing
+AppTest) that logs in, opens the Dashboard, starts the first due audit
+no other auditor has taken, marks a check point "No" and saves. Sessions
+run on threads inside one process, so they share the data layer and the
+compiled app exactly as the sessions of one Streamlit server do.
+
+    python load_test.py --app app.py --users 1,4,8,16 --iterations 3
+
+Runs against a synthetic data directory (never the real CSVs) and prints,
+per concurrency level, rerun latency percentiles, saves per second and
+the process memory.
+"""
+import argparse
+import datetime as dt
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# ---------- SYNTHETIC DATA ----------
+def make_data_dir(data_dir: str, lines: int, units_per_line: int, points_per_unit: int,
+                  due_share: float = 0.2, seed: int = 7):
+    """Write a master with a known share of due rows and an empty history."""
+    from audit_engine import CYCLES_PER_DAY, DATE_COL, working_cycles_from_date
+
+    rng = random.Random(seed)
+    today = dt.date.today()
+    rows = []
+    for li in range(lines):
+        line = f"L{li + 1:02d}-Line"
+        for ui in range(units_per_line):
+            kind = "Fixture" if ui % 2 == 0 else "Tool"
+            unit = f"{'Fixture' if kind == 'Fixture' else 'SA'} {ui + 1}"
+            for pi in range(points_per_unit):
+                changed = today - dt.timedelta(days=rng.randint(5, 60))
+                used = working_cycles_from_date(changed, today)
+                if rng.random() < due_share:
+                    frequency = used + rng.randint(0, 4000)
+                else:
+                    frequency = used + 30 * CYCLES_PER_DAY
+                rows.append({
+                    "line": line,
+                    "sub_assembly": f"Sub Assembly {ui // 4 + 1}",
+                    "kind": kind,
+                    "fixture_no": unit if kind == "Fixture" else "",
+                    "station_no": unit if kind != "Fixture" else "",
+                    "station_name": "",
+                    "fixture_part_desc": f"Part {pi + 1} of {unit}",
+                    "check_point": "No damage & No loosen",
+                    "qty": 1,
+                    "frequency_cycles": frequency,
+                    DATE_COL: changed.strftime("%d-%m-%Y"),
+                })
+    pd.DataFrame(rows).to_csv(os.path.join(data_dir, "config_master.csv"), index=False)
+    os.makedirs(os.path.join(data_dir, "images"))
+
+
+# ---------- ONE SIMULATED AUDITOR ----------
+def _keep_test_runtime():
+    """Let AppTest sessions overlap on threads.
+
+    AppTest installs a mock Runtime in a class attribute for each run and
+    clears it afterwards, so one session finishing would pull the runtime
+    from under another still running. Keep serving the last mock instead.
+    """
+    from streamlit.runtime import Runtime
+
+    last = {"runtime": None}
+
+    def instance(cls):
+        if cls._instance is not None:
+            last["runtime"] = cls._instance
+        if last["runtime"] is None:
+            raise RuntimeError("Runtime hasn't been created!")
+        return last["runtime"]
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or last["runtime"] is not None)
+
+
+def _share_script_cache():
+    """Compile each app once for all sessions, as one Streamlit server does.
+
+    Every AppTest run brings its own ScriptCache and so parses the app
+    again; overlapping parses on threads trip CPython's parser ("AST
+    constructor recursion depth mismatch"). Serve all runs from one cache,
+    whose lock serializes the single compile.
+    """
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    shared = ScriptCache()
+    get_bytecode = ScriptCache.get_bytecode
+    ScriptCache.get_bytecode = lambda self, script_path: get_bytecode(shared, script_path)
+
+
+def _claim_group(at, claimed: set, lock: threading.Lock):
+    """The first due-group button on the Dashboard no other auditor has taken."""
+    with lock:
+        for button in at.button:
+            if button.key and button.key.startswith("audit_btn_") and button.key not in claimed:
+                claimed.add(button.key)
+                return button
+    return None
+
+
+def _timed_run(at, latencies: list):
+    t0 = time.perf_counter()
+    at.run()
+    latencies.append(time.perf_counter() - t0)
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+
+def auditor(app_path: str, user: int, iterations: int, latencies: list, saves: list,
+            errors: list, claimed: set, claim_lock: threading.Lock):
+    from streamlit.testing.v1 import AppTest
+
+    try:
+        for _ in range(iterations):
+            at = AppTest.from_file(app_path, default_timeout=120)
+            _timed_run(at, latencies)
+
+            login = [b for b in at.button if b.label == "Login"]
+            if login and at.text_input:
+                at.text_input[0].input(f"E{user:04d}")
+                login[0].click()
+                _timed_run(at, latencies)
+
+            at.session_state["page"] = "Dashboard"
+            _timed_run(at, latencies)
+            # every auditor takes a group of their own, as on the shop floor
+            start = _claim_group(at, claimed, claim_lock)
+            if start is None:
+                errors.append(f"user {user}: no unclaimed due group left to audit")
+                return
+            start.click()
+            _timed_run(at, latencies)
+            if at.session_state["page"] != "Components":
+                raise RuntimeError(f"{start.label} ({start.key}) did not open the checklist")
+
+            # mark the first check point "No" through the checklist grid's state
+            grid = [d for d in at.dataframe if d.key and d.key.startswith("checklist_")]
+            if grid:
+                at.session_state[grid[0].key] = {
+                    "edited_rows": {0: {"Status": "No"}}, "added_rows": [], "deleted_rows": [],
+                }
+                _timed_run(at, latencies)
+            save = [b for b in at.button if b.label == "Save Audit"]
+            if not save:
+                raise RuntimeError(f"no Save Audit button for {start.key}")
+            save[0].click()
+            _timed_run(at, latencies)
+            saves.append(time.perf_counter())
+    except Exception as e:  # report and keep the other users going
+        errors.append(f"user {user}: {e}")
+
+
+# ---------- REPORTING ----------
+def rss_mb() -> float:
+    """Resident memory of this process (Linux), else peak RSS where available."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_level(app_path: str, users: int, iterations: int) -> dict:
+    latencies, saves, errors = [], [], []
+    claimed, claim_lock = set(), threading.Lock()
+    threads = [
+        threading.Thread(target=auditor, args=(app_path, u, iterations, latencies, saves, errors,
+                                               claimed, claim_lock))
+        for u in range(users)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    lat_ms = np.array(latencies) * 1000 if latencies else np.array([np.nan])
+    return {
+        "users": users,
+        "reruns": len(latencies),
+        "p50_ms": np.percentile(lat_ms, 50),
+        "p95_ms": np.percentile(lat_ms, 95),
+        "p99_ms": np.percentile(lat_ms, 99),
+        "max_ms": lat_ms.max(),
+        "saves": len(saves),
+        "saves_per_s": len(saves) / elapsed if elapsed else 0.0,
+        "rss_mb": rss_mb(),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else "",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-user load test")
+    parser.add_argument("--app", default="app.py", choices=["app.py", "app_1.py"])
+    parser.add_argument("--users", default="1,2,4,8",
+                        help="comma-separated concurrency levels")
+    parser.add_argument("--iterations", type=int, default=2, help="audits per user per level")
+    parser.add_argument("--lines", type=int, default=4)
+    parser.add_argument("--units", type=int, default=12, help="fixtures/stations per line")
+    parser.add_argument("--points", type=int, default=8, help="check points per unit")
+    parser.add_argument("--keep", action="store_true", help="keep the synthetic data directory")
+    args = parser.parse_args()
+
+    # the data layer reads its location at import time, so set it first
+    data_dir = tempfile.mkdtemp(prefix="fixture_audit_load_")
+    os.environ["FIXTURE_AUDIT_DATA_DIR"] = data_dir
+    sys.path.insert(0, REPO_DIR)
+    make_data_dir(data_dir, args.lines, args.units, args.points)
+    os.chdir(data_dir)
+
+    from streamlit.logger import set_log_level
+    from streamlit.testing.v1 import AppTest
+
+    _keep_test_runtime()
+    _share_script_cache()
+    app_path = os.path.join(REPO_DIR, args.app)
+    # one untimed run pays for imports and the compile; it also parses the
+    # config, after which the per-rerun bare-mode warnings can be silenced
+    AppTest.from_file(app_path, default_timeout=120).run()
+    set_log_level("error")
+
+    print(f"{args.app}: {args.lines * args.units * args.points} master rows in {data_dir}")
+    header = f"{'users':>5} {'reruns':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} " \
+             f"{'max ms':>8} {'saves':>5} {'saves/s':>7} {'RSS MB':>7} {'errors':>6}"
+    print(header)
+    for users in [int(u) for u in args.users.split(",")]:
+        r = run_level(app_path, users, args.iterations)
+        print(f"{r['users']:>5} {r['reruns']:>6} {r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} "
+              f"{r['p99_ms']:>8.0f} {r['max_ms']:>8.0f} {r['saves']:>5} "
+              f"{r['saves_per_s']:>7.2f} {r['rss_mb']:>7.0f} {r['errors']:>6}")
+        if r["first_error"]:
+            print(f"      first error: {r['first_error']}")
+
+    if not args.keep:
+        os.chdir(REPO_DIR)
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
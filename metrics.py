@@ -0,0 +1,151 @@
+"""Prometheus-style metrics for the apps, the API and the data layer.
+
+Hot paths only bump in-memory counters and histogram buckets under one
+lock. The exposition text is built when someone asks for it: GET /metrics
+on api_server.py, or a per-process .prom file in DATA_DIR/metrics (for the
+node_exporter textfile collector) that the Streamlit apps rewrite at most
+every WRITE_INTERVAL seconds.
+
+    fixture_audit_reruns_total{page}             counter
+    fixture_audit_due_items_seconds              histogram
+    fixture_audit_master_load_seconds            histogram
+    fixture_audit_history_load_seconds           histogram
+    fixture_audit_save_seconds{target}           histogram
+    fixture_audit_bytes_written_total{target}    counter
+    fixture_audit_pending_audits                 gauge
+    fixture_audit_active_sessions                gauge
+"""
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_DIR = os.path.join(os.environ.get("FIXTURE_AUDIT_DATA_DIR", "."), "metrics")
+WRITE_INTERVAL = int(os.environ.get("FIXTURE_AUDIT_METRICS_INTERVAL", "15"))
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "fixture_audit_reruns_total": ("counter", "Streamlit script reruns per page."),
+    "fixture_audit_due_items_seconds": ("histogram", "Duration of get_due_items calls."),
+    "fixture_audit_master_load_seconds": ("histogram", "Time to parse the master or one shard."),
+    "fixture_audit_history_load_seconds": ("histogram", "Time to read audit history files."),
+    "fixture_audit_save_seconds": ("histogram", "Latency of master and history saves."),
+    "fixture_audit_bytes_written_total": ("counter", "Bytes written to data files and images."),
+    "fixture_audit_pending_audits": ("gauge", "Check points currently due for audit."),
+    "fixture_audit_active_sessions": ("gauge", "Streamlit sessions tracked by this process."),
+}
+
+_lock = threading.Lock()
+_counters = {}  # (name, labels) -> value
+_gauges = {}  # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+_last_write = {"at": 0.0}
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name: str, value: float = 1, **labels):
+    with _lock:
+        key = _key(name, labels)
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name: str, value: float, **labels):
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name: str, seconds: float, **labels):
+    with _lock:
+        key = _key(name, labels)
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [0] * (len(BUCKETS) + 2)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                h[i] += 1
+        h[-2] += seconds
+        h[-1] += 1
+
+
+@contextmanager
+def timed(name: str, **labels):
+    """Observe the duration of a block; also usable as a decorator."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - t0, **labels)
+
+
+# ---------- EXPOSITION ----------
+def _fmt_labels(labels: tuple, extra: dict = None) -> str:
+    pairs = list(labels) + sorted((extra or {}).items())
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def render(extra_labels: dict = None) -> str:
+    """Current values in the Prometheus text exposition format."""
+    with _lock:
+        counters, gauges = dict(_counters), dict(_gauges)
+        histograms = {k: list(v) for k, v in _histograms.items()}
+
+    by_name = {}
+    for store in (counters, gauges, histograms):
+        for name, labels in store:
+            by_name.setdefault(name, []).append(labels)
+
+    out = []
+    for name in sorted(by_name):
+        kind, text = HELP.get(name, ("untyped", ""))
+        out.append(f"# HELP {name} {text}")
+        out.append(f"# TYPE {name} {kind}")
+        for labels in sorted(by_name[name]):
+            key = (name, labels)
+            if key in histograms:
+                h = histograms[key]
+                for bound, n in zip(BUCKETS, h):
+                    le = _fmt_labels(labels + (("le", repr(bound)),), extra_labels)
+                    out.append(f"{name}_bucket{le} {n}")
+                out.append(f"{name}_bucket{_fmt_labels(labels + (('le', '+Inf'),), extra_labels)}"
+                           f" {h[-1]}")
+                out.append(f"{name}_sum{_fmt_labels(labels, extra_labels)} {h[-2]:.6f}")
+                out.append(f"{name}_count{_fmt_labels(labels, extra_labels)} {h[-1]}")
+            else:
+                value = counters[key] if key in counters else gauges[key]
+                out.append(f"{name}{_fmt_labels(labels, extra_labels)} {value}")
+    return "\n".join(out) + "\n"
+
+
+def write_textfile(path: str = None) -> str:
+    """Write this process's metrics for the textfile collector; returns the path.
+
+    Each replica writes its own file, labelled with host and pid so the
+    collector never sees the same series twice.
+    """
+    instance = f"{socket.gethostname()}-{os.getpid()}"
+    path = path or os.path.join(METRICS_DIR, f"fixture_audit_{instance}.prom")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"  # never read half a file
+    with open(tmp_path, "w") as f:
+        f.write(render({"instance_id": instance}))
+    os.replace(tmp_path, path)
+    return path
+
+
+def maybe_write_textfile():
+    """write_textfile() at most every WRITE_INTERVAL seconds; cheap to call per rerun."""
+    now = time.monotonic()
+    with _lock:
+        if now - _last_write["at"] < WRITE_INTERVAL:
+            return
+        _last_write["at"] = now
+    write_textfile()
@@ -0,0 +1,281 @@
+"""Reliability rollup of audit results per check point and month.
+
+    month,line,sub_assembly,kind,unit,fixture_part_desc,check_point,
+    audits,failures,intervals,interval_cycles,last_failure
+
+`audits` counts every time the check point was on a saved checklist and
+`failures` its "No" results. A failure after an earlier one adds the
+working cycles between the two to `interval_cycles`, so mean cycles
+between failures is interval_cycles / intervals.
+
+append_audit_history() folds each save into the rollup under the write
+lock instead of re-scanning history. The rollup is kept per month under
+DATA_DIR/reliability_rollup/ (<YYYY-MM>.csv), next to last_failure.csv,
+an append-only log of each check point's latest failure day; a save
+rewrites only its month's file and appends the points that failed, so
+its cost does not grow with the months kept. History only records "No"
+rows, so a rebuild from history counts failures alone as audits; it also
+compacts last_failure.csv:
+
+    python reliability.py rebuild
+"""
+import argparse
+import csv
+import datetime as dt
+import io
+import os
+import re
+import threading
+
+import pandas as pd
+
+import audit_engine as engine
+
+ROLLUP_DIR = os.path.join(engine.DATA_DIR, "reliability_rollup")
+LAST_FAILURE_PATH = os.path.join(ROLLUP_DIR, "last_failure.csv")
+KEY_COLUMNS = ["month", "line", "sub_assembly", "kind", "unit", "fixture_part_desc", "check_point"]
+POINT_COLUMNS = KEY_COLUMNS[1:]
+COUNT_COLUMNS = ["audits", "failures", "intervals", "interval_cycles"]
+ROLLUP_COLUMNS = KEY_COLUMNS + COUNT_COLUMNS + ["last_failure"]
+LAST_COLUMNS = POINT_COLUMNS + ["last_failure"]
+MONTH_FILE = re.compile(r"^\d{4}-\d{2}\.csv$")
+
+_lock = threading.Lock()
+_rollup_cache = {"sig": None, "df": None}
+_month_cache = {}  # month -> (file signature, rows)
+_last_cache = {"ino": None, "offset": 0, "last": {}}  # check point -> last failure day
+
+
+def _point_frame(df: pd.DataFrame, day) -> pd.DataFrame:
+    """Check point keys of master or history rows, with their month."""
+    df = df.fillna("")
+    unit = df["fixture_no"].where(df["kind"] == "Fixture", df["station_no"])
+    out = pd.DataFrame({
+        "month": day.astype(str).str[:7] if isinstance(day, pd.Series) else day.strftime("%Y-%m"),
+        "line": df["line"],
+        "sub_assembly": df["sub_assembly"],
+        "kind": df["kind"],
+        "unit": unit,
+        "fixture_part_desc": df["fixture_part_desc"],
+        "check_point": df["check_point"],
+    }, index=df.index)
+    return out.astype(str)
+
+
+def _month_path(month: str) -> str:
+    return os.path.join(ROLLUP_DIR, f"{month}.csv")
+
+
+def _months() -> list:
+    if not os.path.isdir(ROLLUP_DIR):
+        return []
+    return sorted(name[:-len(".csv")] for name in os.listdir(ROLLUP_DIR) if MONTH_FILE.match(name))
+
+
+# ---------- READING ----------
+def _read_month(month: str) -> pd.DataFrame:
+    """One month of the rollup; caller holds _lock."""
+    path = _month_path(month)
+    sig = engine.file_signature(path)
+    cached = _month_cache.get(month)
+    if cached is not None and cached[0] == sig:
+        return cached[1]
+    if sig is None:
+        df = pd.DataFrame(columns=ROLLUP_COLUMNS)
+    else:
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        df[COUNT_COLUMNS] = df[COUNT_COLUMNS].apply(pd.to_numeric).astype("int64")
+    _month_cache[month] = (sig, df)
+    return df
+
+
+def load_rollup() -> pd.DataFrame:
+    """The rollup table; only month files that changed are re-read."""
+    with _lock:
+        months = _months()
+        sig = tuple((m, engine.file_signature(_month_path(m))) for m in months)
+        if _rollup_cache["df"] is None or sig != _rollup_cache["sig"]:
+            frames = [_read_month(m) for m in months]
+            df = (pd.concat(frames, ignore_index=True) if frames
+                  else pd.DataFrame(columns=ROLLUP_COLUMNS))
+            _rollup_cache["sig"] = sig
+            _rollup_cache["df"] = df
+        return _rollup_cache["df"]
+
+
+def _read_last() -> dict:
+    """Check point -> last failure day; only rows appended since the last call are read."""
+    with _lock:
+        try:
+            st_ = os.stat(LAST_FAILURE_PATH)
+        except FileNotFoundError:
+            _last_cache.update(ino=None, offset=0, last={})
+            return _last_cache["last"]
+        size = st_.st_size
+        if st_.st_ino != _last_cache["ino"] or size < _last_cache["offset"]:
+            # a rebuild replaced the file with a compacted one
+            _last_cache.update(ino=st_.st_ino, offset=0, last={})
+        if size > _last_cache["offset"]:
+            with open(LAST_FAILURE_PATH, "rb") as f:
+                if _last_cache["offset"] == 0:
+                    f.readline()  # header
+                    _last_cache["offset"] = f.tell()
+                f.seek(_last_cache["offset"])
+                data = f.read()
+            data = data[: data.rfind(b"\n") + 1]
+            last = _last_cache["last"]
+            for row in csv.reader(io.StringIO(data.decode())):
+                point, day = tuple(row[:-1]), row[-1]
+                last[point] = max(day, last.get(point, day))
+            _last_cache["offset"] += len(data)
+        return _last_cache["last"]
+
+
+def point_summary(months: list = None, line: str = None) -> pd.DataFrame:
+    """Per check point over the given months: audits, failures, rate and MCBF."""
+    df = load_rollup()
+    if months:
+        df = df[df["month"].isin(months)]
+    if line:
+        df = df[df["line"] == line]
+    df = df.groupby(POINT_COLUMNS, as_index=False)[COUNT_COLUMNS].sum()
+    df["failure_rate"] = (df["failures"] / df["audits"].where(df["audits"] > 0)).round(3)
+    df["mean_cycles_between_failures"] = (
+        df["interval_cycles"] / df["intervals"].where(df["intervals"] > 0)
+    ).round(0)
+    df = df.drop(columns=["intervals", "interval_cycles"])
+    return df.sort_values(["failures", "failure_rate"], ascending=False, ignore_index=True)
+
+
+# ---------- UPDATING ----------
+def _write_month(month: str, df: pd.DataFrame):
+    path = _month_path(month)
+    engine._write_atomic(lambda p: df.to_csv(p, index=False), path)
+    with _lock:
+        _month_cache[month] = (engine.file_signature(path), df)
+
+
+def _append_last(last: dict):
+    new_file = not os.path.exists(LAST_FAILURE_PATH)
+    with open(LAST_FAILURE_PATH, "a", newline="") as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(LAST_COLUMNS)
+        writer.writerows(list(point) + [day] for point, day in last.items())
+
+
+def _fold(rows: dict, last: dict, df_points: pd.DataFrame, df_failed: pd.DataFrame,
+          failure_days: pd.Series):
+    """Add audited points and failures (in time order) to `rows` and `last` in place.
+
+    `rows` maps rollup key -> counts and must hold every key the points and
+    failures touch that is already rolled up; `last` maps check point ->
+    last failure day for at least the failed points.
+    """
+    def row(key):
+        return rows.setdefault(key, {"audits": 0, "failures": 0, "intervals": 0,
+                                     "interval_cycles": 0, "last_failure": ""})
+
+    for key, n in df_points.value_counts().items():
+        row(key)["audits"] += int(n)
+    for key, day in zip(df_failed.itertuples(index=False, name=None), failure_days):
+        r = row(key)
+        r["failures"] += 1
+        point = key[1:]
+        if point in last and last[point] < day:
+            r["intervals"] += 1
+            r["interval_cycles"] += engine.working_cycles_from_date(
+                dt.date.fromisoformat(last[point]), dt.date.fromisoformat(day)
+            )
+        last[point] = max(day, last.get(point, day))
+        r["last_failure"] = max(r["last_failure"], day)
+
+
+def _rows_frame(rows: dict) -> pd.DataFrame:
+    df = pd.DataFrame([list(key) + list(r.values()) for key, r in rows.items()],
+                      columns=ROLLUP_COLUMNS)
+    return df.sort_values(KEY_COLUMNS, ignore_index=True)
+
+
+def update_rollup(records: list, checked: pd.DataFrame = None, today: dt.date = None):
+    """Fold one save into the rollup; caller holds engine.write_lock().
+
+    `records` are the history rows just appended (the failures), `checked`
+    the master rows that were on the checklist. Without `checked` only the
+    failures count as audits. Only the month files and check points of
+    this save are read and written.
+    """
+    if not os.path.exists(LAST_FAILURE_PATH):
+        rebuild_rollup(locked=True)  # history before this save
+    today = today or dt.date.today()
+    df_failed = pd.DataFrame(records)
+    if len(df_failed):
+        df_failed = _point_frame(df_failed, df_failed["timestamp"])
+        failure_days = pd.Series([today.isoformat()] * len(df_failed))
+    else:
+        df_failed = pd.DataFrame(columns=KEY_COLUMNS)
+        failure_days = pd.Series([], dtype=str)
+    df_points = _point_frame(checked, today) if checked is not None else df_failed
+
+    keys = set(df_points.itertuples(index=False, name=None))
+    keys |= set(df_failed.itertuples(index=False, name=None))
+    with _lock:
+        months = {month: _read_month(month) for month in sorted({key[0] for key in keys})}
+    rows = {}
+    for month, df in months.items():
+        mine = df[df.set_index(KEY_COLUMNS).index.isin(list(keys))]
+        for rec in mine.to_dict("records"):
+            rows[tuple(rec[c] for c in KEY_COLUMNS)] = {
+                c: rec[c] for c in COUNT_COLUMNS + ["last_failure"]
+            }
+    known = _read_last()
+    failed_points = {key[1:] for key in df_failed.itertuples(index=False, name=None)}
+    last = {point: known[point] for point in failed_points if point in known}
+
+    _fold(rows, last, df_points, df_failed, failure_days)
+
+    for month, df in months.items():
+        df_new = _rows_frame({key: r for key, r in rows.items() if key[0] == month})
+        keep = df[~df.set_index(KEY_COLUMNS).index.isin(df_new.set_index(KEY_COLUMNS).index)]
+        df_month = pd.concat([keep, df_new]) if len(keep) else df_new
+        _write_month(month, df_month.sort_values(KEY_COLUMNS, ignore_index=True))
+    if last:
+        _append_last(last)
+
+
+def rebuild_rollup(locked: bool = False) -> int:
+    """Recompute the rollup from the whole history, archives included."""
+    def rebuild():
+        since = min(engine.read_archive_summary()["months"], default=None)
+        df_hist = engine.load_history(since=since)
+        rows, last = {}, {}
+        if not df_hist.empty:
+            df_hist = df_hist[df_hist["status"].astype(str) == "No"].sort_values("timestamp")
+            df_failed = _point_frame(df_hist, df_hist["timestamp"])
+            days = df_hist["timestamp"].astype(str).str[:10]
+            _fold(rows, last, df_failed, df_failed, days)
+
+        os.makedirs(ROLLUP_DIR, exist_ok=True)
+        df_roll = _rows_frame(rows)
+        months = dict(tuple(df_roll.groupby("month"))) if len(df_roll) else {}
+        for month in _months():
+            if month not in months:
+                os.remove(_month_path(month))
+        for month, df_month in months.items():
+            _write_month(month, df_month.reset_index(drop=True))
+        df_last = pd.DataFrame([list(point) + [day] for point, day in last.items()],
+                               columns=LAST_COLUMNS)
+        engine._write_atomic(lambda p: df_last.to_csv(p, index=False), LAST_FAILURE_PATH)
+        return len(df_hist)
+
+    if locked:
+        return rebuild()
+    with engine.write_lock():
+        return rebuild()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reliability rollup maintenance")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+    print(f"rolled up {rebuild_rollup()} failures into {ROLLUP_DIR}")
@@ -0,0 +1,141 @@
+"""Render-cost budgets for every page of both apps.
+
+Each page is run headlessly (streamlit.testing AppTest) against a fixed
+synthetic data directory, and every rerun is measured for
+
+    elements   number of rendered elements, containers and columns included
+    md_bytes   bytes of markdown/HTML emitted (st.markdown, st.write of text)
+    ms         median rerun time over --repeats runs
+
+A measure above its budget is a failure and the exit status is 1, so this
+can gate any local or CI run:
+
+    python render_budget.py                 # both apps, all pages
+    python render_budget.py --app app_1.py --repeats 5
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 2 lines x 12 units x 8 check points; due groups and history stay small
+DATA_SHAPE = {"lines": 2, "units_per_line": 12, "points_per_unit": 8}
+
+# (elements, md_bytes, ms) per page; about 25 % over the measured cost
+BUDGETS = {
+    "app.py": {
+        "Login": (25, 450, 400),
+        "Dashboard": (390, 2000, 800),
+        "Components": (35, 500, 800),
+        "Configure": (72, 570, 800),
+        "Planning": (68, 450, 800),
+        "Audit History": (38, 500, 800),
+    },
+    "app_1.py": {
+        "Login": (17, 850, 400),
+        "Dashboard": (390, 2050, 800),
+        "Components": (32, 500, 800),
+        "Configure": (70, 600, 800),
+        "Planning": (67, 470, 800),
+        "Audit History": (37, 520, 800),
+    },
+}
+
+
+# ---------- MEASURING ----------
+def _walk(node):
+    yield node
+    for child in getattr(node, "children", {}).values():
+        yield from _walk(child)
+
+
+def measure(at) -> tuple:
+    """(element count, markdown bytes) of the last run of `at`."""
+    nodes = [n for n in _walk(at._tree) if n is not at._tree]
+    md_bytes = sum(len(m.value.encode()) for m in at.markdown)
+    return len(nodes), md_bytes
+
+
+def open_page(at, page: str):
+    """Navigate `at` to `page` the way a user would reach it."""
+    if page == "Components":
+        at.session_state["page"] = "Dashboard"
+        at.run()
+        starts = [b for b in at.button if b.key and b.key.startswith("audit_btn_")]
+        if starts:  # the checklist of the most urgent due group
+            starts[0].click()
+            at.run()
+            return
+    at.session_state["page"] = page
+    at.run()
+
+
+def run_page(app_path: str, page: str, repeats: int) -> dict:
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(app_path, default_timeout=120)
+    at.run()  # Login
+    open_page(at, page)
+    if at.exception:
+        raise RuntimeError(f"{page}: {at.exception[0].message}")
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        at.run()
+        times.append((time.perf_counter() - t0) * 1000)
+    elements, md_bytes = measure(at)
+    return {"elements": elements, "md_bytes": md_bytes, "ms": statistics.median(times)}
+
+
+# ---------- MAIN ----------
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check per-page render budgets")
+    parser.add_argument("--app", choices=sorted(BUDGETS), action="append",
+                        help="app to check (repeatable); default both")
+    parser.add_argument("--repeats", type=int, default=3, help="timed reruns per page")
+    args = parser.parse_args()
+
+    # the data layer reads its location at import time, so set it first
+    data_dir = tempfile.mkdtemp(prefix="fixture_audit_budget_")
+    os.environ["FIXTURE_AUDIT_DATA_DIR"] = data_dir
+    sys.path.insert(0, REPO_DIR)
+    from load_test import make_data_dir
+    from streamlit.logger import set_log_level
+
+    make_data_dir(data_dir, DATA_SHAPE["lines"], DATA_SHAPE["units_per_line"],
+                  DATA_SHAPE["points_per_unit"])
+    os.chdir(data_dir)
+
+    failures = 0
+    try:
+        for app in args.app or sorted(BUDGETS):
+            app_path = os.path.join(REPO_DIR, app)
+            run_page(app_path, "Login", 1)  # pays for imports and first parses
+            set_log_level("error")
+            print(f"{app}")
+            print(f"  {'page':<14} {'elements':>14} {'md bytes':>16} {'ms':>12}")
+            for page, budget in BUDGETS[app].items():
+                result = run_page(app_path, page, args.repeats)
+                cells, over = [], []
+                for (name, value), limit in zip(result.items(), budget):
+                    cells.append(f"{value:.0f}/{limit}")
+                    if value > limit:
+                        over.append(name)
+                status = f"  OVER: {', '.join(over)}" if over else ""
+                print(f"  {page:<14} {cells[0]:>14} {cells[1]:>16} {cells[2]:>12}{status}")
+                failures += bool(over)
+    finally:
+        os.chdir(REPO_DIR)
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    print(f"budget exceeded on {failures} page(s)" if failures else "all pages within budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
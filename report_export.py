@@ -0,0 +1,282 @@
+import os
+import threading
+
+import pandas as pd
+from PIL import Image
+
+try:
+    import xlsxwriter
+except ImportError:  # Excel export is optional
+    xlsxwriter = None
+
+import audit_engine as engine
+from image_manifest import get_image_manifest
+
+
+# ---------- STREAMING AUDIT REPORTS ----------
+# History is read in chunks, joined with a small slice of the master and
+# written straight to the output file. Thumbnails come from the image
+# manifest and are only referenced by path, so neither the whole history
+# nor the images are held in memory while a report is produced.
+REPORTS_DIR = os.path.join(engine.DATA_DIR, "reports")
+CHUNK_ROWS = 5000
+
+JOIN_KEYS = ["line", "sub_assembly", "kind", "fixture_no", "station_no",
+             "fixture_part_desc", "check_point"]
+REPORT_COLUMNS = [
+    ("timestamp", "Timestamp", 19),
+    ("audit_no", "Audit No", 9),
+    ("line", "Line", 10),
+    ("unit", "Fixture / Station", 14),
+    ("fixture_part_desc", "Fixture Part description", 36),
+    ("check_point", "Check point", 24),
+    ("frequency_cycles", "Frequency (cycles)", 12),
+    ("status", "Status", 7),
+    ("changed_before_date", "Changed before date", 12),
+    ("remarks", "Remarks", 30),
+]
+NUMERIC_COLUMNS = {"audit_no", "frequency_cycles"}  # history is read as text
+
+
+def _master_lookup(lines: list = None) -> pd.DataFrame:
+    df = engine.load_master(lines)
+    df = df[[c for c in JOIN_KEYS + ["frequency_cycles"] if c in df.columns]]
+    return df.fillna("").astype(str).drop_duplicates(subset=JOIN_KEYS)
+
+
+def _read_chunks(paths: list, chunk_rows: int):
+    for path in paths:
+        yield from pd.read_csv(path, dtype=str, chunksize=chunk_rows, encoding="utf-8-sig")
+
+
+def iter_report_rows(history_path: str, audit_no=None, line=None, month=None,
+                     chunk_rows: int = CHUNK_ROWS):
+    """Yield filtered history chunks joined with master data.
+
+    `month` is a "YYYY-MM" string matched against the history timestamp.
+    Archived months are read when the month or audit number lives there.
+    """
+    paths = engine.archive_paths(since=month, until=month, audit_no=audit_no)
+    if os.path.exists(history_path):
+        paths.append(history_path)
+    if not paths:
+        return
+    df_master = _master_lookup([line] if line else None)
+
+    for chunk in _read_chunks(paths, chunk_rows):
+        chunk = chunk.fillna("")
+        if audit_no is not None:
+            chunk = chunk[chunk["audit_no"] == str(audit_no)]
+        if line:
+            chunk = chunk[chunk["line"] == line]
+        if month:
+            chunk = chunk[chunk["timestamp"].str.startswith(month)]
+        if chunk.empty:
+            continue
+        chunk = chunk.merge(df_master, on=JOIN_KEYS, how="left").fillna("")
+        chunk["unit"] = chunk["fixture_no"].where(chunk["fixture_no"] != "",
+                                                  chunk["station_no"])
+        yield chunk
+
+
+# ---------- EXCEL ----------
+def _is_number(value) -> bool:
+    try:
+        float(value)
+    except (TypeError, ValueError):
+        return False
+    return value != ""
+
+
+def write_excel_report(out_path: str, chunks, manifest) -> int:
+    if xlsxwriter is None:
+        raise RuntimeError("Excel export needs the 'xlsxwriter' package.")
+
+    wb = xlsxwriter.Workbook(out_path, {"constant_memory": True})
+    ws = wb.add_worksheet("Audit report")
+    bold = wb.add_format({"bold": True, "bg_color": "#DDE3EA", "border": 1})
+    wrap = wb.add_format({"text_wrap": True, "valign": "top"})
+
+    for c, (_, title, width) in enumerate(REPORT_COLUMNS):
+        ws.set_column(c, c, width)
+        ws.write(0, c, title, bold)
+    img_col = len(REPORT_COLUMNS)
+    ws.set_column(img_col, img_col, 24)
+    ws.write(0, img_col, "Image", bold)
+
+    r = 0
+    for chunk in chunks:
+        for rec in chunk.to_dict("records"):
+            r += 1
+            thumb = manifest.thumbnail(rec["image_info"])
+            if thumb:
+                ws.set_row(r, 64)
+            for c, (key, _, _) in enumerate(REPORT_COLUMNS):
+                value = rec.get(key, "")
+                if key in NUMERIC_COLUMNS and _is_number(value):
+                    ws.write_number(r, c, float(value), wrap)
+                else:
+                    # never ws.write(): a remark starting with "=" would become a formula
+                    ws.write_string(r, c, str(value), wrap)
+            if thumb:
+                ws.embed_image(r, img_col, thumb)
+    wb.close()
+    return r
+
+
+# ---------- PDF ----------
+def _pdf_text(value, width: int) -> str:
+    text = str(value)
+    if len(text) > width:
+        text = text[: width - 1] + "~"
+    text = text.encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+class StreamingPdf:
+    """Minimal PDF writer that flushes every object as soon as it is complete.
+
+    Only the byte offsets of written objects, the page object numbers and
+    the ids of already embedded thumbnails are kept until close(), which
+    writes the page tree and xref table.
+    """
+
+    PAGE_W, PAGE_H = 842, 595  # A4 landscape, points
+    MARGIN = 30
+
+    def __init__(self, path: str):
+        self.f = open(path, "wb")
+        self.f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self.offsets = {}
+        self.page_ids = []
+        self.image_ids = {}  # thumbnail path -> (object id, width, height)
+        self.next_id = 4  # 1 catalog, 2 page tree, 3 font
+        self._write_obj(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+                           b"/Encoding /WinAnsiEncoding >>")
+        self._new_page()
+
+    def _alloc(self) -> int:
+        obj_id = self.next_id
+        self.next_id += 1
+        return obj_id
+
+    def _write_obj(self, obj_id: int, body: bytes):
+        self.offsets[obj_id] = self.f.tell()
+        self.f.write(f"{obj_id} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    def _write_stream(self, obj_id: int, data: bytes, extra: str = ""):
+        header = f"<< /Length {len(data)} {extra}>>\nstream\n".encode()
+        self._write_obj(obj_id, header + data + b"\nendstream")
+
+    def _new_page(self):
+        self.ops = []
+        self.images = {}
+        self.y = self.PAGE_H - self.MARGIN
+
+    def _flush_page(self):
+        content_id = self._alloc()
+        self._write_stream(content_id, "\n".join(self.ops).encode("latin-1"))
+        xobjects = " ".join(f"/{name} {obj_id} 0 R" for name, obj_id in self.images.items())
+        page_id = self._alloc()
+        self._write_obj(page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {self.PAGE_W} {self.PAGE_H}] "
+            f"/Resources << /Font << /F1 3 0 R >> /XObject << {xobjects} >> >> "
+            f"/Contents {content_id} 0 R >>"
+        ).encode())
+        self.page_ids.append(page_id)
+
+    def ensure_space(self, height: float) -> bool:
+        """Start a new page if `height` does not fit; True if a page was started."""
+        if self.y - height >= self.MARGIN:
+            return False
+        self._flush_page()
+        self._new_page()
+        return True
+
+    def text(self, x: float, y: float, text: str, size: float = 7):
+        self.ops.append(f"BT /F1 {size} Tf {x:.1f} {y:.1f} Td ({text}) Tj ET")
+
+    def jpeg(self, x: float, y: float, path: str):
+        # each distinct image is written once and referenced from every page using it
+        if path not in self.image_ids:
+            with Image.open(path) as im:
+                w, h = im.size
+            with open(path, "rb") as fh:
+                data = fh.read()
+            obj_id = self._alloc()
+            self._write_stream(obj_id, data, (
+                f"/Type /XObject /Subtype /Image /Width {w} /Height {h} "
+                f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode "
+            ))
+            self.image_ids[path] = (obj_id, w, h)
+        obj_id, w, h = self.image_ids[path]
+        name = f"Im{obj_id}"
+        self.images[name] = obj_id
+        scale = min(1.0, 50.0 / h)
+        self.ops.append(f"q {w * scale:.1f} 0 0 {h * scale:.1f} {x:.1f} {y:.1f} cm /{name} Do Q")
+
+    def close(self):
+        self._flush_page()
+        kids = " ".join(f"{p} 0 R" for p in self.page_ids)
+        self._write_obj(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode())
+        self._write_obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref_at = self.f.tell()
+        self.f.write(f"xref\n0 {self.next_id}\n0000000000 65535 f \n".encode())
+        for obj_id in range(1, self.next_id):
+            self.f.write(f"{self.offsets[obj_id]:010d} 00000 n \n".encode())
+        self.f.write((f"trailer\n<< /Size {self.next_id} /Root 1 0 R >>\n"
+                      f"startxref\n{xref_at}\n%%EOF\n").encode())
+        self.f.close()
+
+
+def write_pdf_report(out_path: str, chunks, manifest, title: str = "Audit report") -> int:
+    pdf = StreamingPdf(out_path)
+    char_w = 3.4  # approx. width of a 7pt Helvetica character
+
+    def header():
+        pdf.text(pdf.MARGIN, pdf.y - 12, _pdf_text(title, 120), size=12)
+        pdf.y -= 26
+        x = pdf.MARGIN
+        for _, label, width in REPORT_COLUMNS:
+            pdf.text(x, pdf.y, _pdf_text(label, width))
+            x += width * char_w + 4
+        pdf.text(x, pdf.y, "Image")
+        pdf.y -= 10
+
+    header()
+    n = 0
+    for chunk in chunks:
+        for rec in chunk.to_dict("records"):
+            thumb = manifest.thumbnail(rec["image_info"])
+            height = 56 if thumb else 12
+            if pdf.ensure_space(height):
+                header()
+            x = pdf.MARGIN
+            for key, _, width in REPORT_COLUMNS:
+                pdf.text(x, pdf.y - 8, _pdf_text(rec.get(key, ""), width))
+                x += width * char_w + 4
+            if thumb:
+                pdf.jpeg(x, pdf.y - 52, thumb)
+            pdf.y -= height
+            n += 1
+    pdf.close()
+    return n
+
+
+def export_report(fmt: str, history_path: str, images_dir: str,
+                  audit_no=None, line=None, month=None) -> tuple:
+    """Write an Excel ("xlsx") or PDF ("pdf") report; returns (path, row count)."""
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    scope = "_".join(
+        str(v) for v in (f"audit{audit_no}" if audit_no is not None else None, line, month) if v
+    ) or "all"
+    out_path = os.path.join(REPORTS_DIR, f"audit_report_{scope.replace(' ', '_')}.{fmt}")
+    tmp_path = f"{out_path}.{os.getpid()}.{threading.get_ident()}.tmp"  # or another session
+    manifest = get_image_manifest(images_dir)
+    chunks = iter_report_rows(history_path, audit_no=audit_no, line=line, month=month)
+    if fmt == "xlsx":
+        n = write_excel_report(tmp_path, chunks, manifest)
+    else:
+        n = write_pdf_report(tmp_path, chunks, manifest, title=f"Audit report - {scope}")
+    os.replace(tmp_path, out_path)
+    return out_path, n
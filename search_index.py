@@ -0,0 +1,209 @@
+import io
+import math
+import os
+import re
+import threading
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+import audit_engine as engine
+
+
+# ---------- INVERTED INDEX ----------
+# Master rows are indexed on part description and check point; history rows
+# additionally on remarks. The master part is rebuilt when the master
+# changes, the history part only reads the bytes appended since the last
+# refresh, so a "Save Audit" costs a tail read rather than a full rebuild.
+# rotate_history() rewrites the hot file, which the index notices from the
+# file identity and the archive summary's history generation, and rebuilds.
+# Archived months are not indexed.
+MASTER_FIELDS = ["fixture_part_desc", "check_point"]
+HISTORY_FIELDS = ["fixture_part_desc", "check_point", "remarks"]
+RESULT_COLUMNS = [
+    "source", "ref", "audit_no", "line", "fixture / station",
+    "fixture_part_desc", "check_point", "remarks", "score",
+]
+READ_BLOCK = 8 * 1024 * 1024  # bytes
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text) -> list:
+    if not isinstance(text, str):
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _clean(value) -> str:
+    return "" if pd.isna(value) else str(value)
+
+
+class _Postings:
+    def __init__(self):
+        self.postings = defaultdict(dict)  # token -> {doc_id: term frequency}
+        self.docs = []  # doc_id -> result tuple
+        self._arrays = {}  # token -> (doc ids, term frequencies), built on query
+
+    def add(self, doc: tuple, text: str):
+        doc_id = len(self.docs)
+        self.docs.append(doc)
+        for token in tokenize(text):
+            hits = self.postings[token]
+            hits[doc_id] = hits.get(doc_id, 0) + 1
+
+    def _array(self, token):
+        hits = self.postings.get(token)
+        if not hits:
+            return None
+        cached = self._arrays.get(token)
+        # postings only ever grow, so a length mismatch means new documents
+        if cached is None or len(cached[0]) != len(hits):
+            ids = np.fromiter(hits.keys(), dtype=np.int64, count=len(hits))
+            tfs = np.fromiter(hits.values(), dtype=np.float64, count=len(hits))
+            cached = (ids, tfs)
+            self._arrays[token] = cached
+        return cached
+
+    def search(self, tokens: list, limit: int) -> list:
+        arrays = [self._array(t) for t in dict.fromkeys(tokens)]
+        if not arrays or any(a is None for a in arrays):
+            return []
+        arrays.sort(key=lambda a: len(a[0]))
+
+        n_docs = len(self.docs)
+        ids = arrays[0][0]
+        scores = np.zeros(len(ids))
+        for p_ids, p_tfs in arrays:
+            common, keep, take = np.intersect1d(
+                ids, p_ids, assume_unique=True, return_indices=True
+            )
+            idf = math.log(1 + n_docs / len(p_ids))
+            scores = scores[keep] + idf * p_tfs[take] / (p_tfs[take] + 1.0)
+            ids = common
+
+        if len(ids) > limit:
+            top = np.argpartition(-scores, limit)[:limit]
+            ids, scores = ids[top], scores[top]
+        return list(zip(scores.tolist(), ids.tolist()))
+
+
+class SearchIndex:
+    def __init__(self, history_path: str):
+        self.history_path = history_path
+        self.master = _Postings()
+        self.history = _Postings()
+        self._master_sig = None
+        self._history_header = None
+        self._history_offset = 0
+        self._history_rows = 0
+        self._history_identity = None
+        self._lock = threading.Lock()
+
+    # ----- building -----
+    def _build_master(self):
+        self.master = _Postings()
+        df = engine.load_master()
+        for row_id, rec in zip(df.index, df.to_dict("records")):
+            unit = rec.get("fixture_no") if _clean(rec.get("fixture_no")) else rec.get("station_no")
+            doc = (
+                "Master", int(row_id), "", _clean(rec.get("line")), _clean(unit),
+                _clean(rec.get("fixture_part_desc")), _clean(rec.get("check_point")), "",
+            )
+            self.master.add(doc, " ".join(_clean(rec.get(c)) for c in MASTER_FIELDS))
+
+    def _reset_history(self, identity=None):
+        self.history = _Postings()
+        self._history_header = None
+        self._history_offset = 0
+        self._history_rows = 0
+        self._history_identity = identity
+
+    def _index_history_block(self, block: bytes):
+        df = pd.read_csv(
+            io.BytesIO(block), header=None, names=self._history_header, dtype=str
+        )
+        for rec in df.to_dict("records"):
+            unit = rec.get("fixture_no") if _clean(rec.get("fixture_no")) else rec.get("station_no")
+            doc = (
+                "History", self._history_rows, _clean(rec.get("audit_no")),
+                _clean(rec.get("line")), _clean(unit), _clean(rec.get("fixture_part_desc")),
+                _clean(rec.get("check_point")), _clean(rec.get("remarks")),
+            )
+            self.history.add(doc, " ".join(_clean(rec.get(c)) for c in HISTORY_FIELDS))
+            self._history_rows += 1
+
+    def _refresh_history(self):
+        if not os.path.exists(self.history_path):
+            self._reset_history()
+            return
+        # the generation is read before the file, so a rotation in between
+        # still shows up as a new identity on the next refresh
+        generation = engine.read_archive_summary().get("history_generation", 0)
+        with open(self.history_path, "rb") as f:
+            st_ = os.fstat(f.fileno())
+            identity = (st_.st_dev, st_.st_ino, generation)
+            if identity != self._history_identity or st_.st_size < self._history_offset:
+                self._reset_history(identity)  # rotated, replaced or truncated
+            if st_.st_size == self._history_offset:
+                return
+
+            if self._history_header is None:
+                header_line = f.readline()
+                self._history_header = (
+                    header_line.decode("utf-8-sig").strip().split(",")
+                )
+                self._history_offset = f.tell()
+            f.seek(self._history_offset)
+            carry = b""
+            while True:
+                chunk = f.read(READ_BLOCK)
+                if not chunk:
+                    break
+                data = carry + chunk
+                cut = data.rfind(b"\n") + 1
+                if cut == 0:
+                    carry = data
+                    continue
+                self._index_history_block(data[:cut])
+                self._history_offset += cut
+                carry = data[cut:]
+
+    def refresh(self):
+        with self._lock:
+            sig = engine.master_signature()
+            if sig != self._master_sig:
+                self._build_master()
+                self._master_sig = sig
+            self._refresh_history()
+
+    # ----- querying -----
+    def search(self, query: str, limit: int = 100) -> pd.DataFrame:
+        tokens = tokenize(query)
+        if not tokens:
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+        self.refresh()
+
+        hits = []
+        with self._lock:
+            for part in (self.master, self.history):
+                for score, doc_id in part.search(tokens, limit):
+                    hits.append((score, part.docs[doc_id]))
+        hits.sort(key=lambda h: (h[0], h[1][1]), reverse=True)  # newest first on ties
+
+        rows = [doc + (round(score, 3),) for score, doc in hits[:limit]]
+        return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(history_path: str = engine.HISTORY_PATH) -> SearchIndex:
+    """Process-wide index per history file, shared by all sessions."""
+    key = os.path.abspath(history_path)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = SearchIndex(history_path)
+        return _indexes[key]
@@ -0,0 +1,32 @@
+"""Start the Streamlit app with the shared caches already built.
+
+    python serve.py app.py --server.port 8501
+    python serve.py app_1.py --server.headless true
+
+Streamlit runs every session's script in this one process and imports
+audit_engine once, so the master, hierarchy, cycles table, due set and
+history counters built here are what the first tablet to connect gets.
+Any arguments after the script are passed on to `streamlit run`.
+"""
+import sys
+import time
+
+from streamlit.web import cli as stcli
+
+import audit_engine as engine
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    t0 = time.perf_counter()
+    timings = engine.warmup()
+    steps = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items())
+    print(f"warm-up done in {(time.perf_counter() - t0) * 1000:.0f} ms ({steps})", flush=True)
+
+    sys.argv = ["streamlit", "run"] + sys.argv[1:]
+    sys.exit(stcli.main())
+
+
+if __name__ == "__main__":
+    main()
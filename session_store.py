@@ -0,0 +1,186 @@
+import logging
+import os
+import sys
+import threading
+import time
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+# ---------- PER-SESSION CHECKLIST STATE ----------
+# The Components checklist keeps one compact RowState (image capture) per
+# "No" check point in a process-level store keyed by session id; status,
+# date and remark live in the checklist grid widget. That lets the server
+# measure every session, and clear the checklist widgets (grid edits,
+# upload and camera buffers) of long-idle tablets once a server-wide cap
+# is exceeded. Paths of photos already saved are kept.
+SESSION_BYTES_CAP = int(os.environ.get("FIXTURE_AUDIT_SESSION_CAP_MB", "64")) * 1024 * 1024
+IDLE_SECONDS = 15 * 60
+# widget keys of the Components checklist in the apps
+CHECKLIST_WIDGET_PREFIXES = ("checklist_", "img_mode_", "file_", "cam_")
+
+
+class RowState:
+    __slots__ = ("image_mode", "image_path", "image_key")
+
+    def __init__(self):
+        self.image_mode = "Upload"
+        self.image_path = ""
+        self.image_key = 0  # bumped once an image is on disk, to drop the widget buffer
+
+
+def deep_sizeof(obj, _seen=None) -> int:
+    """Approximate retained bytes of `obj`, following containers and slots."""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "getbuffer") and hasattr(obj, "size"):  # UploadedFile
+        return size + int(obj.size)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, _seen) + deep_sizeof(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(v, _seen) for v in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(deep_sizeof(getattr(obj, a, None), _seen) for a in obj.__slots__)
+    return size
+
+
+class SessionStore:
+    def __init__(self, cap_bytes: int = SESSION_BYTES_CAP, idle_seconds: int = IDLE_SECONDS):
+        self.cap_bytes = cap_bytes
+        self.idle_seconds = idle_seconds
+        self.checklists = {}  # session id -> {row id: RowState}
+        self.usage = {}  # session id -> {"bytes": int, "last_seen": float}
+        self.states = {}  # session id -> its st.session_state, to clear on eviction
+        self.evicted = 0
+        self._lock = threading.Lock()
+
+    def checklist(self, session_id: str) -> dict:
+        with self._lock:
+            return self.checklists.setdefault(session_id, {})
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self.checklists.pop(session_id, None)
+
+    def was_evicted(self, session_id: str) -> bool:
+        return session_id in self.usage and self.usage[session_id].get("evicted", False)
+
+    def track(self, session_id: str, widget_state: dict, session_state=None):
+        """Record this session's footprint (checklist + widget values) and enforce the cap.
+
+        `session_state` is the session's own state object, kept so that an
+        eviction can clear its checklist widgets.
+        """
+        with self._lock:
+            nbytes = deep_sizeof(self.checklists.get(session_id, {})) + deep_sizeof(widget_state)
+            self.usage[session_id] = {"bytes": nbytes, "last_seen": time.time()}
+            if session_state is not None:
+                self.states[session_id] = session_state
+            self._enforce_cap(session_id)
+            metrics.set_gauge("fixture_audit_active_sessions", len(self.usage))
+
+    def _enforce_cap(self, current_id: str):
+        if st.runtime.exists():
+            for sid in list(self.usage):
+                if not st.runtime.get_instance().is_active_session(sid):
+                    self._drop(sid)
+
+        total = sum(u["bytes"] for u in self.usage.values())
+        if total <= self.cap_bytes:
+            return
+        now = time.time()
+        idle = sorted(
+            (u["last_seen"], sid) for sid, u in self.usage.items()
+            if sid != current_id and now - u["last_seen"] > self.idle_seconds
+        )
+        for _, sid in idle:
+            total -= self.usage[sid]["bytes"]
+            self._evict(sid)
+            total += self.usage[sid]["bytes"]
+            if total <= self.cap_bytes:
+                break
+        if total > self.cap_bytes:
+            logger.warning("session state %.1f MB exceeds cap of %.1f MB with no idle sessions left",
+                           total / 1e6, self.cap_bytes / 1e6)
+
+    def _drop(self, session_id: str):
+        self.checklists.pop(session_id, None)
+        self.usage.pop(session_id, None)
+        self.states.pop(session_id, None)
+
+    def _evict(self, session_id: str):
+        """Clear an idle session's checklist widgets; its RowStates keep saved photo paths.
+
+        The draft id and the image keys change as well, so values the browser
+        still holds for the old widgets are not taken up again on its next rerun.
+        """
+        for rs in self.checklists.get(session_id, {}).values():
+            rs.image_key += 1
+        remaining = {}
+        state = self.states.get(session_id)
+        if state is not None:
+            for key in list(state.filtered_state):
+                if key == "audit_draft" or key.startswith(CHECKLIST_WIDGET_PREFIXES):
+                    del state[key]
+            remaining = state.filtered_state
+        nbytes = deep_sizeof(self.checklists.get(session_id, {})) + deep_sizeof(remaining)
+        self.usage[session_id] = {"bytes": nbytes, "last_seen": self.usage[session_id]["last_seen"],
+                                  "evicted": True}
+        self.evicted += 1
+        logger.info("evicted checklist state of idle session %s", session_id)
+
+    def report(self) -> dict:
+        with self._lock:
+            now = time.time()
+            sessions = [
+                {"session": sid[:8], "kb": round(u["bytes"] / 1024, 1),
+                 "idle_s": int(now - u["last_seen"]), "evicted": u.get("evicted", False)}
+                for sid, u in sorted(self.usage.items(), key=lambda kv: -kv[1]["bytes"])
+            ]
+            return {
+                "sessions": sessions,
+                "total_kb": round(sum(u["bytes"] for u in self.usage.values()) / 1024, 1),
+                "cap_kb": round(self.cap_bytes / 1024, 1),
+                "evicted": self.evicted,
+            }
+
+
+_store = SessionStore()
+
+
+def current_session_id() -> str:
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "local"
+
+
+def session_checklist() -> dict:
+    return _store.checklist(current_session_id())
+
+
+def clear_session_checklist():
+    _store.clear(current_session_id())
+
+
+def track_session():
+    """Call once per rerun: measures this session and evicts idle ones over the cap."""
+    ctx = get_script_run_ctx()
+    sid = current_session_id()
+    if _store.was_evicted(sid):
+        st.toast("Unsaved checklist edits were cleared after a long idle period; "
+                 "photos already taken are kept.")
+    _store.track(sid, {k: v for k, v in st.session_state.items()},
+                 ctx.session_state if ctx is not None else None)
+
+
+def session_report() -> dict:
+    return _store.report()